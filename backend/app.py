@@ -1,18 +1,65 @@
+import os
+import secrets
+from datetime import timedelta
+from dotenv import load_dotenv
+
+# Load .env before importing modules that read their settings from the environment.
+load_dotenv()
+
 from flask import Flask
 from flask_cors import CORS 
+from flask_jwt_extended import JWTManager
 from database import init_db, db
+from database.commands import register_db_commands
 from routes.report_routes import report_bp
 from routes.auth_routes import auth_bp
 from collector import register_collector
-from dotenv import load_dotenv
-
-load_dotenv()
+from ingest import register_ingest
+from utils.json_provider import configure_json
+from ml_model.classify import register_classifier
+from utils.upload_processing import MAX_UPLOAD_BYTES
+from utils.staging import register_staging
+from utils.metrics import init_metrics
+from utils.export import register_export
 
 app = Flask(__name__)
+# Signs upload tokens; set SECRET_KEY in production, and to the same value on every worker
+app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
+if not app.config['SECRET_KEY']:
+    # A fixed fallback would let anyone forge tokens. A random one is safe, but
+    # tokens then only work on the worker that issued them, until it restarts.
+    print("Warning: SECRET_KEY is not set; using a random key for this process.")
+    app.config['SECRET_KEY'] = secrets.token_hex(32)
+# Access and refresh tokens are signed with JWT_SECRET_KEY (SECRET_KEY if unset)
+app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', app.config['SECRET_KEY'])
+app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(minutes=int(os.environ.get('JWT_ACCESS_TOKEN_MINUTES', 15)))
+app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=int(os.environ.get('JWT_REFRESH_TOKEN_DAYS', 30)))
+# Set to 1 to also accept a plain user_id, for old mobile builds that don't send access tokens yet
+app.config['LEGACY_USER_ID_AUTH'] = os.environ.get('LEGACY_USER_ID_AUTH', '0') == '1'
+JWTManager(app)
+# Let the front proxy serve uploads (nginx: X-Accel-Redirect, Apache/lighttpd: X-Sendfile)
+app.config['UPLOADS_ACCEL_REDIRECT_PREFIX'] = os.environ.get('UPLOADS_ACCEL_REDIRECT_PREFIX')
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
+# Reject request bodies larger than the upload cap (plus room for the form fields) up front
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES + 1024 * 1024
+# Public base URL for links to uploaded images
+app.config['MEDIA_BASE_URL'] = os.environ.get('MEDIA_BASE_URL', 'http://localhost:5000')
+# Serialize JSON responses with orjson (if installed)
+app.config['FAST_JSON'] = os.environ.get('FAST_JSON') == '1'
+configure_json(app)
+# Load the classifier at startup instead of on the first /classify request
+app.config['CLASSIFIER_WARMUP'] = os.environ.get('CLASSIFIER_WARMUP') == '1'
 
-CORS(app)
+CORS(app, expose_headers=['X-Next-Cursor'])
+# Request latency, query and stage metrics on /metrics; SLOW_REQUEST_MS enables the slow-request log
+init_metrics(app)
 init_db(app)
 
 app.register_blueprint(report_bp)
 app.register_blueprint(auth_bp)
-register_collector(app)
\ No newline at end of file
+register_collector(app)
+register_ingest(app)
+register_db_commands(app)
+register_classifier(app)
+register_staging(app)
+register_export(app)
\ No newline at end of file
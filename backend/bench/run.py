@@ -0,0 +1,285 @@
+"""
+Benchmarks the API endpoints and the collector's ingest loop against a
+seeded throwaway database. Runs fully offline: geocoding uses the static
+provider and the YOLO model is replaced with a fake that sleeps for
+--model-latency-ms per batch.
+
+    cd backend
+    python -m bench.run --reports 10000 --scraped 100000 --out bench/results/$(git rev-parse --short HEAD).json
+    python -m bench.run --reports 10000 --scraped 100000 --compare bench/results/<baseline>.json
+
+Use the same volumes, iterations and concurrency when comparing two runs.
+Seeding 1M rows takes a while; pass --workdir to keep the seeded database
+and reuse it on the next run.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reports', type=int, default=10000, help='User reports to seed.')
+    parser.add_argument('--scraped', type=int, default=100000, help='Scraped reports to seed.')
+    parser.add_argument('--users', type=int, default=200, help='Users to seed.')
+    parser.add_argument('--iterations', type=int, default=500, help='Requests per read benchmark.')
+    parser.add_argument('--post-iterations', type=int, default=100, help='POST /report requests.')
+    parser.add_argument('--ingest-batches', type=int, default=20, help='Collector batches of 1000 API results.')
+    parser.add_argument('--concurrency', type=int, default=4, help='Client threads.')
+    parser.add_argument('--model-latency-ms', type=float, default=50.0, help='Simulated inference time per batch.')
+    parser.add_argument('--no-viewport-cache', action='store_true', help='Disable the map list response cache.')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for data and requests.')
+    parser.add_argument('--workdir', help='Keep the database and uploads here (default: a temporary directory).')
+    parser.add_argument('--out', help='Write the results as JSON to this file.')
+    parser.add_argument('--compare', help='Print the change against an earlier results file.')
+    return parser.parse_args()
+
+def configure_environment(args, workdir):
+    """Points the app at the benchmark database and offline stand-ins. Must run before importing app."""
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['GEOCODE_PROVIDER'] = 'static'
+    os.environ['GEOCODE_CACHE_PATH'] = os.path.join(workdir, 'geocode_cache.db')
+    # post_report identifies the user with a plain user_id
+    os.environ['LEGACY_USER_ID_AUTH'] = '1'
+    if args.no_viewport_cache:
+        os.environ['VIEWPORT_CACHE_MAX_BYTES'] = '0'
+    # Uploads are written relative to the working directory.
+    os.makedirs(os.path.join(workdir, 'uploads'), exist_ok=True)
+    os.chdir(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+
+class FakeBackend:
+    """Stands in for the YOLO model: sleeps once per batch and returns random labels."""
+
+    def __init__(self, latency, seed):
+        self.latency = latency
+        self.rng = random.Random(seed)
+
+    def predict(self, images):
+        time.sleep(self.latency)
+        return [self.rng.choice(['trash', 'pothole', None]) for _ in images]
+
+def summarize(durations, errors, wall):
+    durations = sorted(durations)
+    def percentile(p):
+        return round(durations[min(len(durations) - 1, int(len(durations) * p))] * 1000, 3)
+    return {
+        'count': len(durations),
+        'errors': errors,
+        'mean_ms': round(statistics.fmean(durations) * 1000, 3),
+        'p50_ms': percentile(0.50),
+        'p90_ms': percentile(0.90),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': round(durations[-1] * 1000, 3),
+        'throughput_rps': round(len(durations) / wall, 2),
+    }
+
+def run_requests(app, make_request, iterations, concurrency, seed):
+    """
+    Sends `iterations` requests from `concurrency` threads, each with its own
+    test client and random generator. Non-2xx responses count as errors.
+    """
+    durations = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(index, count):
+        nonlocal errors
+        client = app.test_client()
+        rng = random.Random(seed * 1000 + index)
+        local = []
+        local_errors = 0
+        for _ in range(count):
+            start = time.perf_counter()
+            response = make_request(client, rng)
+            local.append(time.perf_counter() - start)
+            if response.status_code >= 300:
+                local_errors += 1
+        with lock:
+            durations.extend(local)
+            errors += local_errors
+
+    shares = [iterations // concurrency + (1 if i < iterations % concurrency else 0) for i in range(concurrency)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker, i, n) for i, n in enumerate(shares) if n]:
+            future.result()
+    return summarize(durations, errors, time.perf_counter() - start)
+
+def random_viewport(rng, seed_module):
+    lat, lon = seed_module.random_point(rng)
+    span = rng.choice([0.01, 0.02, 0.04, 0.08])   # roughly zoom 16 down to zoom 13
+    status = rng.choice([None, 'open', 'closed'])
+    params = {'sw_lat': lat - span / 2, 'sw_lng': lon - span, 'ne_lat': lat + span / 2, 'ne_lng': lon + span}
+    if status:
+        params['status'] = status
+    return params
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nChange against {baseline_path} ({baseline['meta'].get('commit')}):")
+    print(f"  {'benchmark':<28}{'p50':>22}{'p95':>22}{'throughput':>24}")
+    for name, current in results['benchmarks'].items():
+        previous = baseline['benchmarks'].get(name)
+        if previous is None:
+            continue
+        cells = []
+        for metric in ('p50_ms', 'p95_ms', 'throughput_rps'):
+            old, new = previous[metric], current[metric]
+            change = f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+            cells.append(f"{old:>8} -> {new:<8} {change:>7}")
+        print(f"  {name:<28}" + ''.join(f"{cell:>22}" for cell in cells))
+
+def main():
+    args = parse_args()
+    workdir = args.workdir or tempfile.mkdtemp(prefix='neatstreet-bench-')
+    out = os.path.abspath(args.out) if args.out else None
+    baseline = os.path.abspath(args.compare) if args.compare else None
+    configure_environment(args, os.path.abspath(workdir))
+
+    from app import app
+    from database import db
+    from database.models import Report, ScrapedReport, User
+    from collector import ingest_scraped_reports
+    from ml_model import classify
+    from utils.geolocate import set_provider, StaticProvider
+    from utils.viewport_cache import viewport_cache
+    from bench import seed as seed_module
+
+    set_provider(StaticProvider('123 Bench St, Gainesville, FL'))
+    classify._load_backend = lambda: FakeBackend(args.model_latency_ms / 1000.0, args.seed)
+    rng = random.Random(args.seed)
+    results = {'meta': {}, 'benchmarks': {}}
+
+    with app.app_context():
+        seed_started = time.perf_counter()
+        if not db.session.scalar(db.select(db.func.count(User.id))):
+            print(f"Seeding {args.users} users, {args.reports} reports and {args.scraped} scraped reports...")
+            user_ids = seed_module.seed_users(args.users)
+            seed_module.seed_reports(args.reports, user_ids, rng)
+            seed_module.seed_scraped_reports(args.scraped, rng)
+            db.session.execute(db.text('ANALYZE'))
+            db.session.commit()
+        else:
+            print(f"Reusing the database in {workdir}")
+            user_ids = db.session.scalars(db.select(User.id)).all()
+        seed_seconds = time.perf_counter() - seed_started
+        row_counts = {
+            'users': len(user_ids),
+            'reports': db.session.scalar(db.select(db.func.count(Report.id))),
+            'scraped_reports': db.session.scalar(db.select(db.func.count(ScrapedReport.id))),
+        }
+        next_source_id = (db.session.scalar(db.select(db.func.max(ScrapedReport.source_id))) or 0) + 1
+
+    def bench(name, make_request, iterations=args.iterations):
+        print(f"Running {name}...")
+        results['benchmarks'][name] = run_requests(app, make_request, iterations, args.concurrency, args.seed)
+
+    bench('user_reports_viewport', lambda c, r: c.get('/user_reports', query_string=random_viewport(r, seed_module)))
+    bench('user_reports_first_page', lambda c, r: c.get('/user_reports', query_string={'status': r.choice(['all', 'open', 'closed'])}))
+    bench('scraped_reports_viewport', lambda c, r: c.get('/scraped-reports', query_string=random_viewport(r, seed_module)))
+    bench('scraped_reports_first_page', lambda c, r: c.get('/scraped-reports', query_string={'status': r.choice(['all', 'open', 'closed'])}))
+    search_terms = [w for w in seed_module.DETAIL_WORDS if len(w) >= 3] + seed_module.STREETS
+    bench('reports_search', lambda c, r: c.get('/reports/search', query_string={'q': r.choice(search_terms)}))
+
+    # Distinct images, so the content-addressed store can't deduplicate them away.
+    images = [seed_module.fake_jpeg(rng) for _ in range(args.post_iterations)]
+    image_lock = threading.Lock()
+
+    def post_report(client, r):
+        with image_lock:
+            image = images.pop()
+        lat, lon = seed_module.random_point(r)
+        form = {'user_id': str(r.choice(user_ids)), 'lat': str(lat), 'lon': str(lon), 'details': seed_module.random_details(r)}
+        if r.random() < 0.5:
+            form['auto_classify'] = 'true'
+        else:
+            form['issue_type'] = r.choice(seed_module.USER_ISSUE_TYPES)
+            if form['issue_type'] == 'other':
+                form['user_defined_issue_type'] = 'bench'
+        form['image'] = (io.BytesIO(image), 'bench.jpg')
+        return client.post('/report', data=form, content_type='multipart/form-data')
+
+    ingest_started = time.perf_counter()
+    bench('post_report', post_report, iterations=args.post_iterations)
+
+    # Time until the background pipeline has processed every posted report.
+    with app.app_context():
+        while db.session.scalar(db.select(db.func.count(Report.id)).where(Report.processing_status == 'pending')):
+            db.session.rollback()
+            time.sleep(0.05)
+    ingest_seconds = time.perf_counter() - ingest_started
+    results['benchmarks']['post_report']['end_to_end_reports_per_second'] = round(args.post_iterations / ingest_seconds, 2)
+
+    # Collector ingest: pages of 1000 API results, half new and half status updates of seeded rows.
+    print("Running collector_ingest...")
+    durations = []
+    with app.app_context():
+        wall_started = time.perf_counter()
+        for _ in range(args.ingest_batches):
+            batch = list(seed_module.fake_api_reports(500, rng, first_id=next_source_id))
+            next_source_id += 500
+            if row_counts['scraped_reports']:
+                existing_ids = rng.sample(range(1, row_counts['scraped_reports'] + 1), min(500, row_counts['scraped_reports']))
+                batch += list(seed_module.fake_api_reports(len(existing_ids), rng))
+                for report, source_id in zip(batch[500:], existing_ids):
+                    report['Id'] = source_id
+            started = time.perf_counter()
+            ingest_scraped_reports(batch)
+            db.session.commit()
+            durations.append(time.perf_counter() - started)
+        summary = summarize(durations, 0, time.perf_counter() - wall_started)
+        summary['rows_per_second'] = round(len(durations) * 1000 / sum(durations), 1)
+        results['benchmarks']['collector_ingest'] = summary
+
+    results['meta'] = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'args': {k: v for k, v in vars(args).items() if k not in ('out', 'compare', 'workdir')},
+        'row_counts': row_counts,
+        'seed_seconds': round(seed_seconds, 2),
+        'viewport_cache': viewport_cache.stats(),
+    }
+
+    print(json.dumps(results['benchmarks'], indent=2))
+    if out:
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        with open(out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {out}")
+    if baseline:
+        compare(results, baseline)
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+import io
+from datetime import datetime, timedelta
+from PIL import Image
+
+from database import db
+from database.models import User, Report
+from collector import ingest_scraped_reports
+
+# Report density follows a few Gainesville hotspots: (lat, lon, spread in degrees, weight)
+HOTSPOTS = [
+    (29.6516, -82.3248, 0.010, 4),   # downtown
+    (29.6436, -82.3549, 0.012, 3),   # UF campus
+    (29.6257, -82.3729, 0.015, 2),   # Archer Rd / Butler Plaza
+    (29.6840, -82.3380, 0.020, 2),   # north Main St
+    (29.6200, -82.3000, 0.025, 1),   # southeast
+]
+CITY_SPREAD = (29.58, -82.45, 29.73, -82.25)   # uniform background noise over the city
+
+REQUEST_TYPES = [
+    'Pothole', 'Illegal Dumping', 'Streetlight Out', 'Graffiti', 'Overgrown Lot',
+    'Missed Trash Pickup', 'Sidewalk Repair', 'Abandoned Vehicle', 'Traffic Signal', 'Litter',
+]
+# Raw CitySourced StatusType values, with rough relative frequencies
+STATUSES = [('Open', 3), ('In Progress', 2), ('Closed', 6), ('Closed - Resolved', 2), ('NotAnIssue', 1), ('Cancelled', 1)]
+USER_STATUSES = [('submitted', 5), ('in progress', 2), ('closed', 3)]
+USER_ISSUE_TYPES = ['trash', 'pothole', 'other']
+STREETS = [
+    'W University Ave', 'NW 13th St', 'SW Archer Rd', 'NE 16th Ave', 'SW 34th St', 'NW 8th Ave',
+    'S Main St', 'N Main St', 'SE Hawthorne Rd', 'NW 39th Ave', 'SW 2nd Ave', 'Depot Ave',
+]
+DETAIL_WORDS = (
+    'large deep pothole near the curb trash bags piled beside dumpster light flickering all night '
+    'graffiti on the wall behind store overgrown grass blocking sidewalk couch left on corner '
+    'broken glass in bike lane cracked sidewalk trip hazard missed pickup again this week'
+).split()
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+def random_point(rng):
+    """A coordinate near one of the HOTSPOTS, or anywhere in the city one time in ten."""
+    if rng.random() < 0.1:
+        south, west, north, east = CITY_SPREAD
+        return rng.uniform(south, north), rng.uniform(west, east)
+    lat, lon, spread, _ = rng.choices(HOTSPOTS, weights=[h[3] for h in HOTSPOTS])[0]
+    return rng.gauss(lat, spread), rng.gauss(lon, spread)
+
+def random_details(rng, words=(4, 20)):
+    return ' '.join(rng.choices(DETAIL_WORDS, k=rng.randint(*words)))
+
+def random_address(rng):
+    return f"{rng.randint(100, 4999)} {rng.choice(STREETS)}, Gainesville, FL"
+
+def fake_api_reports(count, rng, first_id=1, days=730, now=None):
+    """
+    Generates `count` results shaped like the CitySourced API's, so they go
+    through the collector's real ingest path.
+    """
+    now = now or datetime.now()
+    for source_id in range(first_id, first_id + count):
+        lat, lon = random_point(rng)
+        created = now - timedelta(seconds=rng.randint(0, days * 24 * 3600))
+        yield {
+            'Id': source_id,
+            'RequestType': rng.choice(REQUEST_TYPES),
+            'DateCreated': f"/Date({int(created.timestamp() * 1000)}-0500)/",
+            'FormattedAddress': random_address(rng),
+            'Description': random_details(rng),
+            'Latitude': lat,
+            'Longitude': lon,
+            'StatusType': _weighted(rng, STATUSES),
+            'OriginalImageUrl': f"https://example.invalid/images/{source_id}.jpg" if rng.random() < 0.3 else None,
+        }
+
+def fake_jpeg(rng, size=(1600, 1200)):
+    """A noisy JPEG about the size of a downscaled phone photo; noise keeps it from compressing away."""
+    tile = Image.frombytes('RGB', (64, 64), rng.randbytes(64 * 64 * 3))
+    img = tile.resize(size, Image.NEAREST)
+    buffer = io.BytesIO()
+    img.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+def seed_users(count):
+    db.session.execute(db.insert(User), [
+        {'username': f"bench{i}", 'email': f"bench{i}@example.invalid", 'password_hash': 'x'}
+        for i in range(count)
+    ])
+    db.session.commit()
+    return db.session.scalars(db.select(User.id)).all()
+
+def seed_reports(count, user_ids, rng, chunk_size=10000, days=730):
+    """Bulk-inserts `count` ready user reports. Image files are not created."""
+    now = datetime.now()
+    for start in range(0, count, chunk_size):
+        rows = []
+        for i in range(start, min(start + chunk_size, count)):
+            lat, lon = random_point(rng)
+            image_hash = f"{i:064x}"
+            rows.append({
+                'user_id': rng.choice(user_ids),
+                'image_filename': f"{image_hash}.jpg",
+                'thumbnail_filename': f"{image_hash}_400.jpg",
+                'image_hash': image_hash,
+                'issue_type': rng.choice(USER_ISSUE_TYPES),
+                'details': random_details(rng),
+                'address': random_address(rng),
+                'latitude': lat,
+                'longitude': lon,
+                'status': _weighted(rng, USER_STATUSES),
+                'timestamp': now - timedelta(seconds=rng.randint(0, days * 24 * 3600)),
+            })
+        db.session.execute(db.insert(Report), rows)
+        db.session.commit()
+
+def seed_scraped_reports(count, rng, chunk_size=10000):
+    """Inserts `count` scraped reports through ingest_scraped_reports."""
+    for start in range(0, count, chunk_size):
+        ingest_scraped_reports(list(fake_api_reports(min(chunk_size, count - start), rng, first_id=start + 1)))
+        db.session.commit()
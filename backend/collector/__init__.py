@@ -0,0 +1,12 @@
+"""
+Collects 311 reports from external city systems into ScrapedReport.
+
+Each system is a SourceAdapter (see sources.py for the configured ones).
+`flask collect` runs every source once; `flask collector-daemon` keeps them
+all on their own schedules in one long-lived process.
+"""
+from .base import SourceAdapter, CollectorError
+from .citysourced import CitySourcedAdapter, parse_date, normalize_status
+from .commands import register_collector
+from .ingest import ingest_scraped_reports
+from .runner import collect
@@ -0,0 +1,118 @@
+import random
+import time
+from datetime import datetime, timedelta
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import SOURCE_REQUESTS, SOURCE_RETRIES
+
+REQUEST_TIMEOUT = (5, 60)
+# Transient failures are retried with exponential backoff and jitter
+MAX_RETRIES = 4
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class CollectorError(Exception):
+    pass
+
+class SourceAdapter:
+    """
+    One external system that 311 reports are collected from.
+
+    `name` is stored in ScrapedReport.source and keys the source's
+    CollectorState high-water mark. Subclasses implement `fetch_window`, which
+    returns the raw results created in a date range, and `to_row`, which maps
+    one raw result to ScrapedReport column values. The runner splits the
+    range since the last run into `window_days` windows and fetches up to
+    `fetch_workers` of them at once.
+
+    Adapters live as long as the process, so a subclass can keep its HTTP
+    session (keep-alive connections, cookies, CSRF tokens) between runs. The
+    session comes from `session()`, and `request()` retries transient errors.
+    Reports are identified by (source, source_id), so ids only need to be
+    unique within a source.
+    """
+
+    name = None
+    interval = 15 * 60        # seconds between scheduled runs
+    window_days = 30
+    fetch_workers = 4
+    # Re-fetch this far behind the high-water mark, for reports that show up late
+    overlap = timedelta(days=1)
+    # Incremental runs only see recently created reports. This often, a run
+    # reaches back to the oldest report still open here, so status changes
+    # on the city side (open -> closed) are picked up.
+    resync_interval = timedelta(days=1)
+    # Reports open for longer than this are left out of the resync, so one
+    # stale report can't make every resync fetch the source's whole history.
+    resync_max_age = timedelta(days=90)
+
+    def __init__(self):
+        self._session = None
+
+    def initial_date_from(self, now):
+        """Where the first run (or a --full run) starts: the beginning of the previous year."""
+        return datetime(now.year - 1, 1, 1)
+
+    def fetch_window(self, date_from, date_to):
+        raise NotImplementedError
+
+    def to_row(self, raw):
+        """ScrapedReport column values for one raw result, or None if it can't be stored."""
+        raise NotImplementedError
+
+    def report_id(self, raw):
+        raise NotImplementedError
+
+    def date_created(self, raw):
+        """The result's creation time as a naive local datetime, or None."""
+        raise NotImplementedError
+
+    def session(self):
+        """The adapter's pooled HTTP session, created on first use."""
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.fetch_workers)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._session = session
+        return self._session
+
+    def request(self, method, url, **kwargs):
+        """
+        Sends a request over the pooled session. Connection errors, timeouts
+        and 429/5xx responses are retried up to MAX_RETRIES times with
+        exponential backoff (honoring Retry-After); the last response or error
+        is returned or raised as is.
+        """
+        kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                response = self.session().request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                SOURCE_REQUESTS.inc(self.name, 'error')
+                if attempt == MAX_RETRIES:
+                    raise
+                delay = self._backoff(attempt)
+                print(f"[{self.name}] {method} {url} failed: {e}. Retrying in {delay:.1f}s.")
+            else:
+                SOURCE_REQUESTS.inc(self.name, response.status_code)
+                if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    return response
+                delay = self._backoff(attempt, response.headers.get('Retry-After'))
+                print(f"[{self.name}] {method} {url} returned {response.status_code}. Retrying in {delay:.1f}s.")
+            SOURCE_RETRIES.inc(self.name)
+            time.sleep(delay)
+
+    @staticmethod
+    def _backoff(attempt, retry_after=None):
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), RETRY_MAX_DELAY)
+        delay = min(RETRY_BASE_DELAY * 2 ** attempt, RETRY_MAX_DELAY)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
@@ -0,0 +1,233 @@
+import json
+import re
+import threading
+import uuid
+from datetime import datetime
+from urllib.parse import quote, urlsplit
+
+from .base import SourceAdapter, CollectorError
+from .metrics import SOURCE_SESSION_INITS
+
+# Browser headers from the known-good cURL command; origin and referer are per city
+HEADERS = {
+    'accept': 'application/json, text/javascript, */*; q=0.01',
+    'content-type': 'application/x-www-form-urlencoded; charset=UTF-8',
+    # Adding all headers from the successful cURL command to appear as a real browser.
+    'accept-language': 'en-US,en;q=0.9',
+    'priority': 'u=1, i',
+    'sec-ch-ua': '"Not(A:Brand";v="8", "Chromium";v="144", "Google Chrome";v="144"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"Windows"',
+    'sec-fetch-dest': 'empty',
+    'sec-fetch-mode': 'cors',
+    'sec-fetch-site': 'same-origin',
+    'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.0.0 Safari/537.36',
+    'x-requested-with': 'XMLHttpRequest',
+}
+PAGE_SIZE = 1000
+CSRF_COOKIE = 'CsCsrfToken_USA'
+
+def parse_date(date_string):
+    """Parses multiple possible date formats from the API."""
+    if not date_string:
+        return None
+
+    # Handle .NET JSON date format: /Date(1707753341000-0500)/
+    if isinstance(date_string, str) and date_string.startswith('/Date('):
+        try:
+            # Use regex to safely extract the timestamp, which might be negative.
+            match = re.search(r'\((\-?\d+)', date_string)
+            if match:
+                timestamp_ms = int(match.group(1))
+                return datetime.fromtimestamp(timestamp_ms / 1000.0)
+        except (IndexError, ValueError):
+            pass  # Fall through to the next format
+
+    if isinstance(date_string, str):
+        # Normalize ISO-like strings with non-standard fractional seconds
+        # e.g., '2025-11-26T15:36:52.6945979Z' or '...:33.62'
+        # This regex captures the main datetime, fractional seconds, and timezone suffix
+        match = re.match(r'(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})\.(\d+)(.*)', date_string)
+        if match:
+            main_part, fractional_part, tz_part = match.groups()
+            # Pad or truncate fractional part to 6 digits (microseconds)
+            fractional_part = (fractional_part + '000000')[:6]
+            # Reassemble the string, preserving the timezone part
+            date_string = f"{main_part}.{fractional_part}{tz_part}"
+
+    try:
+        return datetime.fromisoformat(date_string)
+    except (ValueError, TypeError):
+        return None
+
+def as_naive_local(dt):
+    """Converts aware datetimes to naive local time so they compare with the /Date() values."""
+    return dt.astimezone().replace(tzinfo=None) if dt.tzinfo else dt
+
+def to_api_date(dt):
+    return f"/Date({int(dt.timestamp() * 1000)})/"
+
+def normalize_status(status):
+    """Maps a raw CitySourced StatusType to 'open', 'closed' or 'hidden'."""
+    if not status:
+        return 'hidden'
+    status = status.lower()
+    if status in ('notanissue', 'cancelled'):
+        return 'hidden'
+    if 'close' in status:
+        return 'closed'
+    return 'open'
+
+class TokenRejected(Exception):
+    pass
+
+class CitySourcedAdapter(SourceAdapter):
+    """
+    A city on the CitySourced platform, e.g. https://gainesvillefl.citysourced.com.
+
+    The API wants a session cookie and CSRF token from the public "nearby"
+    page. They are fetched once and reused across pages, windows and runs
+    until the API rejects them, then fetched again.
+    """
+
+    def __init__(self, name, base_url, location, radius=20000, interval=15 * 60, page_size=PAGE_SIZE):
+        super().__init__()
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.api_url = f"{self.base_url}/pages/ajax/callapiendpoint.ashx"
+        self.page_url = f"{self.base_url}/servicerequests/nearby"
+        self.host = urlsplit(self.base_url).hostname
+        self.location = location   # (longitude, latitude) of the search center
+        self.radius = radius       # meters
+        self.interval = interval
+        self.page_size = page_size
+        self.headers = {**HEADERS, 'origin': self.base_url, 'referer': self.page_url}
+        self._credentials = None
+        self._credentials_lock = threading.Lock()
+
+    def _init_session(self):
+        """Visits the page to get a valid session and CSRF token. Returns (unique_id, csrf_token)."""
+        print(f"[{self.name}] Initializing session to get a fresh CSRF token...")
+        SOURCE_SESSION_INITS.inc(self.name)
+        session = self.session()
+        session.cookies.clear()
+        response = self.request('GET', self.page_url, headers={'user-agent': HEADERS['user-agent']})
+        response.raise_for_status()
+
+        csrf_token = session.cookies.get(CSRF_COOKIE)
+        if not csrf_token:
+            raise CollectorError("Could not retrieve CSRF token.")
+
+        # The uniqueid must be consistent between the cookie and the payload,
+        # mirroring the behavior of the successful cURL command.
+        unique_id = uuid.uuid4().hex
+        session.cookies.set('CsHtml5DeviceUniqueIdv2_USA', unique_id, domain=self.host)
+        # The cURL command also includes a locale cookie, which may be required.
+        session.cookies.set('csLocaleType', 'EN', domain=self.host)
+        return unique_id, csrf_token
+
+    def credentials(self, rejected=None):
+        """
+        The current (unique_id, csrf_token), bootstrapping them if there are
+        none yet or if they are the `rejected` ones. Concurrent window fetches
+        that hit a rejected token share one re-bootstrap.
+        """
+        with self._credentials_lock:
+            if self._credentials is None or self._credentials == rejected:
+                self._credentials = self._init_session()
+            return self._credentials
+
+    def _fetch_page(self, credentials, date_from, date_to, page):
+        """Fetches one page of service requests created between date_from and date_to."""
+        unique_id, csrf_token = credentials
+        json_payload = {
+            "DateFrom": to_api_date(date_from),
+            "DateTo": to_api_date(date_to),
+            # Location seems to be required for this API.
+            "Location": {"X": self.location[0], "Y": self.location[1]},
+            # Adding a radius to define a search area.
+            "Radius": self.radius,
+            "Page": page,
+            "PageSize": self.page_size
+        }
+        json_payload_str = json.dumps(json_payload)
+
+        # To mimic the cURL command as closely as possible, we build the raw
+        # application/x-www-form-urlencoded string manually instead of letting
+        # `requests` build it from a dict. This ensures the URL encoding matches
+        # the known-good request.
+        raw_data = (
+            f"uniqueid={unique_id}&verb=Get&endpoint=servicerequests"
+            f"&json={quote(json_payload_str)}&token={csrf_token}"
+        )
+
+        response = self.request('POST', self.api_url, headers=self.headers, data=raw_data.encode('utf-8'))
+        if response.status_code in (401, 403):
+            raise TokenRejected()
+        response.raise_for_status()
+        data = response.json()
+
+        if 'd' in data and isinstance(data.get('d'), str):
+            inner_data = json.loads(data['d'])
+        else:
+            inner_data = data
+
+        if isinstance(inner_data, dict) and 'Results' in inner_data and isinstance(inner_data['Results'], list):
+            return inner_data['Results']
+        raise ValueError(f"Could not find a 'Results' key containing a list in the API response: {inner_data}")
+
+    def fetch_window(self, date_from, date_to):
+        """Walks every page of one date window, re-bootstrapping the session when the token is rejected."""
+        results = []
+        page = 1
+        credentials = self.credentials()
+        refreshed = False
+        while True:
+            try:
+                page_results = self._fetch_page(credentials, date_from, date_to, page)
+            except TokenRejected:
+                if refreshed:
+                    raise CollectorError("The API rejected a freshly issued CSRF token.")
+                credentials = self.credentials(rejected=credentials)
+                refreshed = True
+                continue
+            refreshed = False
+            results.extend(page_results)
+            if len(page_results) < self.page_size:
+                return results
+            page += 1
+
+    def report_id(self, raw):
+        return raw.get('Id')
+
+    def date_created(self, raw):
+        date_created = parse_date(raw.get('DateCreated'))
+        return as_naive_local(date_created) if date_created else None
+
+    def to_row(self, raw):
+        source_id = raw.get('Id')
+        if not source_id:
+            return None
+
+        date_created = parse_date(raw.get('DateCreated'))
+        if not date_created:
+            print(f"Skipping report {source_id} due to invalid date: {raw.get('DateCreated')}")
+            return None
+
+        return {
+            'source': self.name,
+            'source_id': source_id,
+            'issue_type': raw.get('RequestType', 'Unknown'),
+            'date_created': date_created,
+            'address': raw.get('FormattedAddress', 'No Address Provided'),
+            'details': raw.get('Description'),
+            'latitude': raw.get('Latitude'),
+            'longitude': raw.get('Longitude'),
+            'status': raw.get('StatusType'),
+            'status_normalized': normalize_status(raw.get('StatusType')),
+            'image_url': raw.get('OriginalImageUrl'),
+        }
+
+    def close(self):
+        super().close()
+        self._credentials = None
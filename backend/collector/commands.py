@@ -0,0 +1,92 @@
+import random
+import time
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from database import db
+from utils.metrics import write_textfile
+from utils.viewport_cache import invalidate_reports
+from .base import CollectorError
+from .ingest import normalize_scraped_statuses
+from .runner import collect, print_summary
+from .scheduler import run_daemon
+from .sources import GAINESVILLE, ADAPTERS, get_adapters
+
+def _run_once(adapter, full):
+    try:
+        summary = collect(adapter, full=full)
+    except CollectorError as e:
+        print(f"[{adapter.name}] {e}")
+        return
+    finally:
+        # The collector runs outside the web process; export its timings for node_exporter.
+        write_textfile()
+        adapter.close()
+    print_summary(adapter, summary)
+
+def _adapters_or_exit(names):
+    try:
+        return get_adapters(names)
+    except KeyError as e:
+        raise click.BadParameter(f"Unknown source {e}. Known sources: {', '.join(ADAPTERS)}", param_hint='--source')
+
+@click.command('scrape-gainesville')
+@click.option('--full', is_flag=True, help='Ignore the high-water mark and re-fetch from the start of the previous year.')
+@with_appcontext
+def scrape_gainesville_command(full):
+    """Fetches service request data from Gainesville's 311 system and saves it to the database."""
+    print("Starting to scrape Gainesville 311 data...")
+    _run_once(GAINESVILLE, full)
+
+@click.command('collect')
+@click.option('--source', 'sources', multiple=True, help='Source to collect (repeatable); all sources by default.')
+@click.option('--full', is_flag=True, help='Ignore the high-water marks and re-fetch from the start of the previous year.')
+@with_appcontext
+def collect_command(sources, full):
+    """Runs one collection of each source, one after another."""
+    for adapter in _adapters_or_exit(sources):
+        _run_once(adapter, full)
+
+@click.command('collector-daemon')
+@click.option('--source', 'sources', multiple=True, help='Source to collect (repeatable); all sources by default.')
+@click.option('--metrics-port', type=int, help='Serve Prometheus metrics on this port.')
+@with_appcontext
+def collector_daemon_command(sources, metrics_port):
+    """Collects every source on its own interval until interrupted."""
+    run_daemon(current_app._get_current_object(), _adapters_or_exit(sources), metrics_port)
+
+@click.command('fake-city-api')
+@click.option('--port', default=5055, show_default=True)
+@click.option('--reports', 'count', default=5000, show_default=True, help='Number of fake reports to serve.')
+@click.option('--token-ttl', type=float, help='Expire CSRF tokens after this many seconds.')
+@click.option('--failure-rate', default=0.0, help='Share of API requests that fail with a 503.')
+@click.option('--seed', default=1, show_default=True)
+def fake_city_api_command(port, count, token_ttl, failure_rate, seed):
+    """Serves a fake CitySourced API with generated reports; point e.g. GAINESVILLE_311_URL at it."""
+    from .fake_server import fake_city_reports, serve_fake_city_api
+
+    reports = list(fake_city_reports(count, random.Random(seed)))
+    server = serve_fake_city_api(reports, port, token_ttl=token_ttl, failure_rate=failure_rate, seed=seed)
+    print(f"Serving {count} fake reports on http://127.0.0.1:{server.port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+@click.command('normalize-scraped-status')
+@with_appcontext
+def normalize_scraped_status_command():
+    """Recomputes status_normalized for every scraped report, e.g. after normalize_status changes."""
+    # init_db already fills in rows ingested before the column existed.
+    updated = normalize_scraped_statuses(db.session.connection(), missing_only=False)
+    invalidate_reports('scraped')
+    db.session.commit()
+    print(f"Normalized the status of {updated} scraped reports.")
+
+def register_collector(app):
+    app.cli.add_command(scrape_gainesville_command)
+    app.cli.add_command(collect_command)
+    app.cli.add_command(collector_daemon_command)
+    app.cli.add_command(fake_city_api_command)
+    app.cli.add_command(normalize_scraped_status_command)
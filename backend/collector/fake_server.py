@@ -0,0 +1,108 @@
+"""
+A stand-in for a CitySourced city API, for exercising the collector without
+the network: point a source's base URL (e.g. GAINESVILLE_311_URL) at it.
+
+It mimics what the adapter depends on: the nearby page hands out the CSRF
+cookie, and the API endpoint checks that token, filters by the DateFrom and
+DateTo in the payload and pages the results. Tokens can be made to expire
+and a share of requests can be made to fail, to exercise the token refresh
+and the retry backoff.
+"""
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import Flask, request, jsonify, make_response
+from werkzeug.serving import make_server
+from .citysourced import CSRF_COOKIE
+
+_API_DATE = re.compile(r'/Date\((-?\d+)')
+
+# Raw StatusType values, with rough relative frequencies
+FAKE_STATUSES = [('Open', 3), ('In Progress', 2), ('Closed', 6), ('NotAnIssue', 1), ('Cancelled', 1)]
+FAKE_REQUEST_TYPES = ['Pothole', 'Illegal Dumping', 'Streetlight Out', 'Graffiti', 'Litter']
+
+def _timestamp_ms(api_date):
+    match = _API_DATE.match(api_date or '')
+    return int(match.group(1)) if match else None
+
+def fake_city_reports(count, rng, center=(29.651964, -82.325002), spread=0.05, days=730, first_id=1):
+    """Generates `count` results shaped like the CitySourced API's, around `center` (lat, lon)."""
+    now = datetime.now()
+    statuses, weights = zip(*FAKE_STATUSES)
+    for source_id in range(first_id, first_id + count):
+        created = now - timedelta(seconds=rng.randint(0, days * 24 * 3600))
+        yield {
+            'Id': source_id,
+            'RequestType': rng.choice(FAKE_REQUEST_TYPES),
+            'DateCreated': f"/Date({int(created.timestamp() * 1000)}-0500)/",
+            'FormattedAddress': f"{rng.randint(100, 4999)} Main St",
+            'Description': f"Fake report {source_id}",
+            'Latitude': rng.gauss(center[0], spread),
+            'Longitude': rng.gauss(center[1], spread),
+            'StatusType': rng.choices(statuses, weights=weights)[0],
+            'OriginalImageUrl': None,
+        }
+
+def create_fake_city_api(reports, token_ttl=None, failure_rate=0.0, seed=None):
+    """
+    A Flask app serving `reports` (dicts shaped like the API's results).
+    Tokens expire after `token_ttl` seconds if set; `failure_rate` of the
+    API requests answer 503 with Retry-After: 0.
+    """
+    app = Flask(__name__)
+    reports = sorted(reports, key=lambda r: _timestamp_ms(r['DateCreated']))
+    created = [_timestamp_ms(r['DateCreated']) for r in reports]
+    tokens = {}
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    app.config['stats'] = stats = {'sessions': 0, 'requests': 0, 'rejected': 0, 'failed': 0}
+
+    @app.route('/servicerequests/nearby')
+    def nearby():
+        token = secrets.token_hex(16)
+        with lock:
+            tokens[token] = time.monotonic()
+            stats['sessions'] += 1
+        response = make_response('<html></html>')
+        response.set_cookie(CSRF_COOKIE, token)
+        return response
+
+    @app.route('/pages/ajax/callapiendpoint.ashx', methods=['POST'])
+    def api():
+        token = request.form.get('token')
+        with lock:
+            stats['requests'] += 1
+            issued_at = tokens.get(token)
+            valid = (
+                issued_at is not None and token == request.cookies.get(CSRF_COOKIE)
+                and (token_ttl is None or time.monotonic() - issued_at < token_ttl)
+            )
+            if not valid:
+                stats['rejected'] += 1
+            failed = valid and rng.random() < failure_rate
+            if failed:
+                stats['failed'] += 1
+        if not valid:
+            return jsonify({'Message': 'Invalid token.'}), 403
+        if failed:
+            return jsonify({'Message': 'Service unavailable.'}), 503, {'Retry-After': '0'}
+
+        payload = json.loads(request.form['json'])
+        date_from = _timestamp_ms(payload['DateFrom'])
+        date_to = _timestamp_ms(payload['DateTo'])
+        page, page_size = payload['Page'], payload['PageSize']
+        matching = [r for r, ts in zip(reports, created) if date_from <= ts <= date_to]
+        results = matching[(page - 1) * page_size:page * page_size]
+        return jsonify({'d': json.dumps({'Results': results, 'TotalCount': len(matching)})})
+
+    return app
+
+def serve_fake_city_api(reports, port=0, **kwargs):
+    """Serves create_fake_city_api(reports) on a background thread. Returns the server; its URL is http://127.0.0.1:<server.port>."""
+    server = make_server('127.0.0.1', port, create_fake_city_api(reports, **kwargs), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
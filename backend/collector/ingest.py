@@ -0,0 +1,107 @@
+from database import db
+from database.models import ScrapedReport
+from database.events import prune_report_events
+from utils.viewport_cache import invalidate_reports, prune_invalidation_log
+from .citysourced import normalize_status
+from .metrics import SOURCE_REPORTS, source_stage
+
+INGEST_CHUNK_SIZE = 500
+
+def ingest_scraped_reports(reports, adapter=None, chunk_size=INGEST_CHUNK_SIZE, timings=None):
+    """
+    Inserts new reports and refreshes the status, details and image_url of
+    existing ones. `reports` are raw results from `adapter` (Gainesville by
+    default). Each chunk costs one lookup of the existing source_ids and at
+    most one executemany INSERT and UPDATE. Existing reports are matched on
+    (source, source_id), since each source has its own id space. The caller commits.
+
+    Returns the inserted, updated, unchanged and skipped counts.
+    """
+    if adapter is None:
+        from .sources import GAINESVILLE
+        adapter = GAINESVILLE
+
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+    touched_points = []
+    rows = []
+    with source_stage(adapter.name, 'parse', timings):
+        for report_data in reports:
+            row = adapter.to_row(report_data)
+            if row is None:
+                counts['skipped'] += 1
+            else:
+                rows.append(row)
+
+    with source_stage(adapter.name, 'ingest', timings):
+        _ingest_rows(rows, chunk_size, counts, touched_points)
+
+    for outcome, count in counts.items():
+        SOURCE_REPORTS.inc(adapter.name, outcome, amount=count)
+
+    # Drop cached map responses covering the inserted and updated reports.
+    invalidate_reports('scraped', touched_points)
+    prune_invalidation_log()
+    prune_report_events()
+    return counts
+
+def _ingest_rows(rows, chunk_size, counts, touched_points):
+    for chunk_start in range(0, len(rows), chunk_size):
+        chunk = rows[chunk_start:chunk_start + chunk_size]
+        existing = {
+            (r.source, r.source_id): r for r in db.session.execute(
+                db.select(
+                    ScrapedReport.id, ScrapedReport.source, ScrapedReport.source_id, ScrapedReport.status,
+                    ScrapedReport.details, ScrapedReport.image_url,
+                    ScrapedReport.latitude, ScrapedReport.longitude,
+                ).where(db.tuple_(ScrapedReport.source, ScrapedReport.source_id).in_(
+                    {(row['source'], row['source_id']) for row in chunk}
+                ))
+            )
+        }
+
+        new_rows = []
+        changed_rows = []
+        for row in chunk:
+            current = existing.get((row['source'], row['source_id']))
+            if current is None:
+                new_rows.append(row)
+            elif (current.status, current.details, current.image_url) != (row['status'], row['details'], row['image_url']):
+                changed_rows.append({
+                    'id': current.id,
+                    'status': row['status'],
+                    'status_normalized': row['status_normalized'],
+                    'details': row['details'],
+                    'image_url': row['image_url'],
+                })
+                touched_points.append((current.latitude, current.longitude))
+            else:
+                counts['unchanged'] += 1
+
+        if new_rows:
+            db.session.execute(db.insert(ScrapedReport), new_rows)
+            touched_points.extend((row['latitude'], row['longitude']) for row in new_rows)
+        if changed_rows:
+            db.session.execute(db.update(ScrapedReport), changed_rows)
+        counts['inserted'] += len(new_rows)
+        counts['updated'] += len(changed_rows)
+
+def normalize_scraped_statuses(connection, missing_only=True):
+    """
+    Recomputes status_normalized from status, for the rows where it is NULL
+    or, with `missing_only=False`, for every row. Runs one UPDATE per
+    distinct raw status instead of one per row. Returns the updated count.
+    """
+    missing = [ScrapedReport.status_normalized.is_(None)] if missing_only else []
+    statuses = connection.execute(
+        db.select(ScrapedReport.status).where(*missing).distinct()
+    ).scalars().all()
+    updated = 0
+    for status in statuses:
+        status_filter = ScrapedReport.status.is_(None) if status is None else ScrapedReport.status == status
+        result = connection.execute(
+            db.update(ScrapedReport)
+            .where(*missing, status_filter)
+            .values(status_normalized=normalize_status(status))
+        )
+        updated += result.rowcount
+    return updated
@@ -0,0 +1,36 @@
+import time
+from contextlib import contextmanager
+from utils.metrics import Counter, Gauge, Histogram, stage
+
+SOURCE_STAGE_SECONDS = Histogram(
+    'neatstreet_collector_stage_duration_seconds', 'Time spent per collector stage and source.', ['source', 'stage'],
+)
+SOURCE_REPORTS = Counter(
+    'neatstreet_collector_reports_total', 'Reports seen by the collector, by outcome.', ['source', 'outcome'],
+)
+SOURCE_RUNS = Counter('neatstreet_collector_runs_total', 'Collector runs, by result.', ['source', 'result'])
+SOURCE_REQUESTS = Counter('neatstreet_collector_requests_total', 'HTTP requests to a source, by status.', ['source', 'status'])
+SOURCE_RETRIES = Counter('neatstreet_collector_retries_total', 'HTTP requests to a source that were retried.', ['source'])
+SOURCE_SESSION_INITS = Counter(
+    'neatstreet_collector_session_inits_total', 'Session/CSRF bootstraps against a source.', ['source'],
+)
+SOURCE_LAST_SUCCESS = Gauge(
+    'neatstreet_collector_last_success_timestamp_seconds', 'Unix time of the last successful run.', ['source'],
+)
+
+@contextmanager
+def source_stage(source, name, timings=None):
+    """
+    Times a collector stage (fetch, parse, ingest, commit) for one source,
+    alongside the process-wide collector_<name> stage. Adds the time to
+    `timings` if given.
+    """
+    start = time.perf_counter()
+    try:
+        with stage(f"collector_{name}"):
+            yield
+    finally:
+        elapsed = time.perf_counter() - start
+        SOURCE_STAGE_SECONDS.observe(elapsed, source, name)
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
@@ -0,0 +1,114 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import requests
+from database import db
+from database.models import CollectorState, ScrapedReport
+from .base import CollectorError
+from .ingest import ingest_scraped_reports
+from .metrics import SOURCE_RUNS, SOURCE_LAST_SUCCESS, source_stage
+
+def _date_windows(date_from, date_to, window_days):
+    windows = []
+    window_start = date_from
+    while window_start < date_to:
+        window_end = min(window_start + timedelta(days=window_days), date_to)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
+
+def collect(adapter, full=False):
+    """
+    Runs one collection for `adapter` in the current app context: fetches
+    everything created since its high-water mark (or since
+    `adapter.initial_date_from` with `full`), ingests it and commits.
+
+    Returns a summary with the fetched report count, the ingest counts and
+    the per-stage timings. Raises CollectorError if the run failed; nothing
+    is committed then.
+    """
+    timings = {}
+    try:
+        summary = _collect(adapter, full, timings)
+    except Exception:
+        db.session.rollback()
+        SOURCE_RUNS.inc(adapter.name, 'error')
+        raise
+    SOURCE_RUNS.inc(adapter.name, 'success')
+    SOURCE_LAST_SUCCESS.set(time.time(), adapter.name)
+    return summary
+
+def _collect(adapter, full, timings):
+    run_started_at = datetime.now()
+    state = db.session.get(CollectorState, adapter.name) or CollectorState(source=adapter.name)
+
+    # Only request the delta since the last run, with some overlap for reports
+    # that showed up late.
+    if state.high_water_mark and not full:
+        date_from = state.high_water_mark - adapter.overlap
+        resync = not state.last_resync_at or run_started_at - state.last_resync_at >= adapter.resync_interval
+        if resync:
+            resync_floor = run_started_at - adapter.resync_max_age
+            is_open = (ScrapedReport.source == adapter.name, ScrapedReport.status_normalized == 'open')
+            oldest_open = db.session.scalar(
+                db.select(db.func.min(ScrapedReport.date_created)).where(*is_open)
+            )
+            resync_from = max(oldest_open, resync_floor) if oldest_open else None
+            if resync_from and resync_from < date_from:
+                date_from = resync_from
+                print(f"[{adapter.name}] Re-syncing the status of open reports created since {date_from:%Y-%m-%d}.")
+            if oldest_open and oldest_open < resync_floor:
+                stale = db.session.scalar(
+                    db.select(db.func.count()).select_from(ScrapedReport)
+                    .where(*is_open, ScrapedReport.date_created < resync_floor)
+                )
+                print(f"[{adapter.name}] {stale} open reports created before {resync_floor:%Y-%m-%d} are too old to re-sync.")
+    else:
+        date_from = adapter.initial_date_from(run_started_at)
+        resync = True
+    windows = _date_windows(date_from, run_started_at, adapter.window_days)
+    print(f"[{adapter.name}] Fetching reports created since {date_from:%Y-%m-%d %H:%M} in {len(windows)} windows...")
+
+    # Windows are fetched concurrently over the adapter's pooled session.
+    try:
+        with source_stage(adapter.name, 'fetch', timings), \
+                ThreadPoolExecutor(max_workers=adapter.fetch_workers) as executor:
+            window_results = list(executor.map(lambda window: adapter.fetch_window(*window), windows))
+    except requests.exceptions.RequestException as e:
+        raise CollectorError(f"Error fetching data: {e}") from e
+    except (TypeError, ValueError) as e:
+        raise CollectorError(f"Failed to parse the API response: {e}") from e
+
+    # Windows share their boundaries, so a report may show up twice.
+    reports = list({adapter.report_id(r): r for results in window_results for r in results}.values())
+    print(f"[{adapter.name}] Found {len(reports)} reports from the API.")
+    counts = ingest_scraped_reports(reports, adapter, timings=timings)
+
+    dates_created = [d for d in map(adapter.date_created, reports) if d]
+    if dates_created:
+        newest = max(dates_created)
+        state.high_water_mark = max(newest, state.high_water_mark) if state.high_water_mark else newest
+    state.last_run_at = run_started_at
+    if resync:
+        state.last_resync_at = run_started_at
+    db.session.add(state)
+
+    try:
+        with source_stage(adapter.name, 'commit', timings):
+            db.session.commit()
+    except Exception as e:
+        raise CollectorError(f"Error saving to database: {e}") from e
+
+    return {'fetched': len(reports), 'counts': counts, 'timings': timings}
+
+def print_summary(adapter, summary):
+    counts = summary['counts']
+    timings = summary['timings']
+    print(f"\n[{adapter.name}] Collection summary:")
+    print(f"  - Successfully added {counts['inserted']} new reports to the database.")
+    print(f"  - Updated {counts['updated']} reports whose status, details or image changed.")
+    print(f"  - Skipped {counts['unchanged']} reports that were already up to date.")
+    print(f"  - Skipped {counts['skipped']} reports due to a missing id or an unparsable date format.")
+    print("  - Timings: " + ', '.join(
+        f"{name} {timings.get(name, 0.0):.2f}s" for name in ('fetch', 'parse', 'ingest', 'commit')
+    ))
@@ -0,0 +1,104 @@
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.metrics import render, write_textfile
+from .runner import collect, print_summary
+
+# A failing source is retried sooner than its interval, backing off up to the interval
+FAILURE_RETRY_DELAY = 60
+
+class Scheduler:
+    """
+    Runs every adapter on its own interval until stopped. Due sources run
+    concurrently on a thread pool, each in its own app context; a source is
+    never run again before its previous run finished. Adapters, and so their
+    HTTP sessions and CSRF tokens, are reused across runs.
+    """
+
+    def __init__(self, app, adapters, max_workers=None):
+        self.app = app
+        self.adapters = adapters
+        self.max_workers = max_workers or len(adapters)
+        self._stop = threading.Event()
+        self._next_run = {adapter.name: 0.0 for adapter in adapters}
+        self._failures = {adapter.name: 0 for adapter in adapters}
+        self._running = set()
+        self._lock = threading.Lock()
+
+    def stop(self, *args):
+        self._stop.set()
+
+    def run(self):
+        print(f"Collector scheduler started for {', '.join(a.name for a in self.adapters)}.")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                with self._lock:
+                    due = [
+                        a for a in self.adapters
+                        if a.name not in self._running and self._next_run[a.name] <= now
+                    ]
+                    self._running.update(a.name for a in due)
+                for adapter in due:
+                    executor.submit(self._run_source, adapter)
+                self._stop.wait(self._sleep_time())
+        for adapter in self.adapters:
+            adapter.close()
+        print("Collector scheduler stopped.")
+
+    def _sleep_time(self):
+        with self._lock:
+            pending = [t for name, t in self._next_run.items() if name not in self._running]
+        # Wake up at least every second so finished runs get rescheduled promptly
+        return max(0.0, min(pending + [time.monotonic() + 1.0]) - time.monotonic())
+
+    def _run_source(self, adapter):
+        try:
+            with self.app.app_context():
+                summary = collect(adapter)
+            print_summary(adapter, summary)
+            failures = 0
+            delay = adapter.interval
+        except Exception as e:
+            failures = self._failures[adapter.name] + 1
+            delay = min(FAILURE_RETRY_DELAY * 2 ** (failures - 1), adapter.interval)
+            print(f"[{adapter.name}] Collection failed ({failures} in a row): {e}. Retrying in {delay:.0f}s.")
+        finally:
+            write_textfile()
+        with self._lock:
+            self._failures[adapter.name] = failures
+            self._next_run[adapter.name] = time.monotonic() + delay
+            self._running.discard(adapter.name)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_metrics(port):
+    """Serves the daemon's metrics for Prometheus to scrape on a background thread."""
+    server = ThreadingHTTPServer(('', port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving collector metrics on :{port}/metrics")
+    return server
+
+def run_daemon(app, adapters, metrics_port=None):
+    """Runs the scheduler in the foreground until SIGINT or SIGTERM."""
+    scheduler = Scheduler(app, adapters)
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    signal.signal(signal.SIGINT, scheduler.stop)
+    server = serve_metrics(metrics_port) if metrics_port else None
+    try:
+        scheduler.run()
+    finally:
+        if server:
+            server.shutdown()
@@ -0,0 +1,20 @@
+import os
+from .citysourced import CitySourcedAdapter
+
+# Every source the collector knows about. A new city is one more adapter
+# here; a city on another platform is a new SourceAdapter subclass.
+GAINESVILLE = CitySourcedAdapter(
+    'Gainesville_311',
+    base_url=os.environ.get('GAINESVILLE_311_URL', 'https://gainesvillefl.citysourced.com'),
+    location=(-82.325002, 29.651964),
+    radius=20000,  # 20km
+    interval=int(os.environ.get('GAINESVILLE_311_INTERVAL', 15 * 60)),
+)
+
+ADAPTERS = {adapter.name: adapter for adapter in [GAINESVILLE]}
+
+def get_adapters(names=None):
+    """The adapters with the given names, or all of them. Raises KeyError for an unknown name."""
+    if not names:
+        return list(ADAPTERS.values())
+    return [ADAPTERS[name] for name in names]
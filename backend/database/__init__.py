@@ -3,13 +3,101 @@ from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
+def _add_missing_columns(connection):
+    """
+    Adds model columns that are missing from existing tables.
+
+    `create_all` only creates missing tables, so columns added to a model later
+    are added here. New columns must be nullable or have a server default.
+    """
+    inspector = db.inspect(connection)
+    for table in db.metadata.sorted_tables:
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+            if column.server_default is not None:
+                ddl += f" DEFAULT '{column.server_default.arg}'"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            connection.execute(db.text(ddl))
+
+def _recreate_log_tables(connection):
+    """
+    Recreates tables declared with sqlite_autoincrement that were created
+    without it. Only log tables use it, and their rows are transient, so
+    they are dropped rather than copied.
+    """
+    for table in db.metadata.sorted_tables:
+        if not table.dialect_options['sqlite'].get('autoincrement'):
+            continue
+        sql = connection.execute(
+            db.text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': table.name}
+        ).scalar()
+        if sql and 'AUTOINCREMENT' not in sql.upper():
+            table.drop(connection)
+            table.create(connection)
+
+def _drop_scraped_source_id_unique(connection):
+    """
+    Rebuilds scraped_report if it still has the old UNIQUE (source_id)
+    constraint, which SQLite can't drop in place. Reports are now unique per
+    (source, source_id). Rows keep their ids, so the R*Tree, FTS and rollup
+    data stays valid; the triggers dropped with the old table are recreated
+    by the init_* functions that run afterwards.
+    """
+    inspector = db.inspect(connection)
+    if not any(c['column_names'] == ['source_id'] for c in inspector.get_unique_constraints('scraped_report')):
+        return
+
+    table = db.metadata.tables['scraped_report']
+    for kind in ('trigger', 'index'):
+        names = connection.execute(
+            db.text("SELECT name FROM sqlite_master WHERE type = :kind AND tbl_name = 'scraped_report' AND sql IS NOT NULL"),
+            {'kind': kind},
+        ).scalars().all()
+        for name in names:
+            connection.execute(db.text(f'DROP {kind.upper()} "{name}"'))
+    connection.execute(db.text('ALTER TABLE scraped_report RENAME TO scraped_report_old'))
+    table.create(connection)
+    column_list = ', '.join(f'"{column.name}"' for column in table.columns)
+    connection.execute(db.text(
+        f'INSERT INTO scraped_report ({column_list}) SELECT {column_list} FROM scraped_report_old'
+    ))
+    connection.execute(db.text('DROP TABLE scraped_report_old'))
+
+def _create_missing_indexes(connection):
+    """Creates model indexes missing from existing tables (create_all skips those)."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
 def init_db(app):
     basedir = os.path.abspath(os.path.dirname(__file__))
     db_path = os.path.join(basedir, '../data/app.db')
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    # DATABASE_URL points the app at another SQLite file, e.g. a benchmark database
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', f'sqlite:///{db_path}')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     db.init_app(app)
 
     with app.app_context():
         from . import models
-        db.create_all() 
\ No newline at end of file
+        from .spatial import init_spatial_index
+        from .search import init_search_index
+        from .rollups import init_rollups
+        from .events import init_report_events
+        from collector.ingest import normalize_scraped_statuses
+        db.create_all()
+        with db.engine.begin() as connection:
+            _add_missing_columns(connection)
+            _drop_scraped_source_id_unique(connection)
+            # Scraped reports ingested before status_normalized existed
+            normalize_scraped_statuses(connection)
+            _recreate_log_tables(connection)
+            _create_missing_indexes(connection)
+            init_spatial_index(connection)
+            init_search_index(connection)
+            init_rollups(connection)
+            init_report_events(connection)
@@ -0,0 +1,45 @@
+import click
+from flask.cli import with_appcontext
+from . import db
+from .models import Report, ScrapedReport, utc_isoformat
+from .rollups import rebuild_rollups
+
+BACKFILL_CHUNK_SIZE = 1000
+
+def _backfill_utc(model, source_column, target_column):
+    updated = 0
+    while True:
+        rows = db.session.execute(
+            db.select(model.id, source_column)
+            .where(target_column.is_(None), source_column.is_not(None))
+            .limit(BACKFILL_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            return updated
+        db.session.execute(
+            db.update(model),
+            [{'id': row.id, target_column.key: utc_isoformat(row[1])} for row in rows]
+        )
+        db.session.commit()
+        updated += len(rows)
+
+@click.command('backfill-utc-timestamps')
+@with_appcontext
+def backfill_utc_timestamps_command():
+    """Precomputes the UTC timestamp strings for rows written before they were stored."""
+    reports = _backfill_utc(Report, Report.timestamp, Report.timestamp_utc)
+    scraped = _backfill_utc(ScrapedReport, ScrapedReport.date_created, ScrapedReport.date_created_utc)
+    print(f"Backfilled {reports} reports and {scraped} scraped reports.")
+
+@click.command('rebuild-rollups')
+@with_appcontext
+def rebuild_rollups_command():
+    """Recomputes the issue_rollup counts from the report tables."""
+    with db.engine.begin() as connection:
+        rebuild_rollups(connection)
+    rows = db.session.scalar(db.text("SELECT count(*) FROM issue_rollup"))
+    print(f"Rebuilt {rows} rollup rows.")
+
+def register_db_commands(app):
+    app.cli.add_command(backfill_utc_timestamps_command)
+    app.cli.add_command(rebuild_rollups_command)
@@ -0,0 +1,56 @@
+from sqlalchemy import text
+from . import db
+from .models import ReportEvent
+from .rollups import ROLLUP_SOURCES
+
+# Events older than this are deleted; live subscribers are at most a poll behind
+EVENT_RETENTION_SECONDS = 3600
+
+# Per source table: the columns whose changes clients see. Backfills of
+# derived columns (timestamp_utc, ...) don't produce events.
+WATCHED_COLUMNS = {
+    'report': 'issue_type, user_defined_issue_type, details, address, status, processing_status, latitude, longitude',
+    'scraped_report': 'issue_type, details, address, status, status_normalized, image_url, latitude, longitude',
+}
+
+def _event_statement(table, action, row, previous=None):
+    spec = ROLLUP_SOURCES[table]
+    previous_status = spec['status'].format(row=previous) if previous else 'NULL'
+    return (
+        f"INSERT INTO report_event (source, action, report_id, latitude, longitude, status, previous_status) "
+        f"VALUES ('{spec['source']}', '{action}', {row}.id, {row}.latitude, {row}.longitude, "
+        f"{spec['status'].format(row=row)}, {previous_status});"
+    )
+
+def init_report_events(connection):
+    """
+    Creates the triggers that append a report_event row for every write to
+    the report tables, whichever process makes it (the API, the ingest
+    pipeline or the collector). The open/closed/hidden status is the one the
+    rollups use.
+    """
+    for table in WATCHED_COLUMNS:
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_event_insert AFTER INSERT ON {table}
+            BEGIN
+                {_event_statement(table, 'insert', 'new')}
+            END
+        """))
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_event_delete AFTER DELETE ON {table}
+            BEGIN
+                {_event_statement(table, 'delete', 'old')}
+            END
+        """))
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_event_update AFTER UPDATE OF {WATCHED_COLUMNS[table]} ON {table}
+            BEGIN
+                {_event_statement(table, 'update', 'new', previous='old')}
+            END
+        """))
+
+def prune_report_events():
+    """Deletes events old enough that every subscriber has been sent them. The caller commits."""
+    db.session.execute(db.delete(ReportEvent).where(
+        ReportEvent.created_at < db.func.datetime('now', f'-{EVENT_RETENTION_SECONDS} seconds')
+    ))
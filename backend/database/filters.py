@@ -0,0 +1,22 @@
+from . import db
+from .models import Report, ScrapedReport
+
+def issue_type_filter(column, issue_type):
+    """Matches `issue_type` case-insensitively: user reports use lowercase types ('pothole'), the 311 feed title case ('Pothole')."""
+    return db.func.lower(column) == issue_type.lower()
+
+def report_status_filters(status):
+    """Returns the filter clauses for the `status` query parameter on user reports."""
+    if status == 'open':
+        # "submitted" and "in progress" are considered open.
+        return [Report.status.in_(['submitted', 'in progress'])]
+    elif status == 'closed':
+        return [Report.status == 'closed']
+    return []
+
+def scraped_status_filters(status):
+    """Returns the filter clauses for the `status` query parameter on scraped reports."""
+    # 'NotAnIssue' and 'Cancelled' reports are normalized to 'hidden' and never shown.
+    if status in ('open', 'closed'):
+        return [ScrapedReport.status_normalized == status]
+    return [ScrapedReport.status_normalized.in_(['open', 'closed'])]
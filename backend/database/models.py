@@ -1,6 +1,29 @@
 from datetime import datetime, timezone
+from flask import current_app
 from . import db
 
+DEFAULT_MEDIA_BASE_URL = 'http://localhost:5000'
+
+def utc_isoformat(dt):
+    """Formats a datetime as ISO 8601 UTC with a Z suffix."""
+    if dt is None:
+        return None
+    # If the datetime object is "naive" (has no timezone info),
+    # assume it's in the server's local timezone and convert it to an aware object.
+    if dt.tzinfo is None:
+        dt = dt.astimezone()
+    # Now convert to UTC and format as ISO 8601, replacing +00:00 with Z for max compatibility
+    return dt.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+def _utc_default(source_column):
+    """Column default that precomputes the UTC string of another column at write time."""
+    def default(context):
+        return utc_isoformat(context.get_current_parameters().get(source_column))
+    return default
+
+def media_base_url():
+    return current_app.config.get('MEDIA_BASE_URL') or DEFAULT_MEDIA_BASE_URL
+
 # Define User Model
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -10,11 +33,19 @@ class User(db.Model):
 
 # Define Report Model
 class Report(db.Model):
+    __table_args__ = (
+        # Keyset pagination on (timestamp, id), overall and per user
+        db.Index('ix_report_timestamp_id', 'timestamp', 'id'),
+        db.Index('ix_report_user_id_timestamp_id', 'user_id', 'timestamp', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     user = db.relationship('User', backref=db.backref('reports', lazy=True))
     image_filename = db.Column(db.String(120), nullable=False)
     thumbnail_filename = db.Column(db.String(120), nullable=True)
+    # SHA-256 of the original upload; the image store names files after it
+    image_hash = db.Column(db.String(64), nullable=True, index=True)
     issue_type = db.Column(db.String(50), nullable=False)
     user_defined_issue_type = db.Column(db.String(100), nullable=True) # New field
     details = db.Column(db.String(500), nullable=True) # New field
@@ -22,71 +53,157 @@ class Report(db.Model):
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(50), nullable=False, default='submitted')
+    # 'pending' until the background ingest pipeline has filled in the thumbnail and address
+    processing_status = db.Column(db.String(20), nullable=False, default='ready', server_default='ready')
     timestamp = db.Column(db.DateTime, default=datetime.now)
+    # utc_isoformat(timestamp), computed once at insert
+    timestamp_utc = db.Column(db.String(32), nullable=True, default=_utc_default('timestamp'))
 
-    def to_dict(self):
-        timestamp_iso = None
-        if self.timestamp:
-            # If the datetime object is "naive" (has no timezone info),
-            # assume it's in the server's local timezone and convert it to an aware object.
-            if self.timestamp.tzinfo is None:
-                dt_aware = self.timestamp.astimezone()
-            else:
-                dt_aware = self.timestamp
-            # Now convert to UTC and format as ISO 8601, replacing +00:00 with Z for max compatibility
-            timestamp_iso = dt_aware.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+    @classmethod
+    def serialized_columns(cls):
+        """The columns read by `serialize`, for column-projected queries."""
+        return (
+            cls.id, cls.user_id, cls.thumbnail_filename, cls.image_filename, cls.image_hash,
+            cls.issue_type, cls.user_defined_issue_type, cls.details, cls.address,
+            cls.latitude, cls.longitude, cls.status, cls.processing_status,
+            cls.timestamp, cls.timestamp_utc,
+        )
 
+    @staticmethod
+    def serialize(row, base_url=None):
+        """Serializes a Report, or a row of `serialized_columns`, to a dict."""
+        base_url = base_url or media_base_url()
         return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'thumbnail_url': f"http://localhost:5000/uploads/{self.thumbnail_filename}" if self.thumbnail_filename else None,
-            'image_url': f"http://localhost:5000/uploads/{self.image_filename}",
-            'issue_type': self.issue_type,
-            'user_defined_issue_type': self.user_defined_issue_type,
-            'details': self.details,
-            'address': self.address,
-            'latitude': self.latitude,
-            'longitude': self.longitude,
-            'status': self.status,
-            'timestamp': timestamp_iso,
+            'id': row.id,
+            'user_id': row.user_id,
+            'thumbnail_url': f"{base_url}/uploads/{row.thumbnail_filename}" if row.thumbnail_filename else None,
+            'image_url': f"{base_url}/uploads/{row.image_filename}",
+            # Append ?w=<pixels> to get the smallest derivative at least that wide
+            'image_variants_url': f"{base_url}/images/{row.image_hash}" if row.image_hash else None,
+            'issue_type': row.issue_type,
+            'user_defined_issue_type': row.user_defined_issue_type,
+            'details': row.details,
+            'address': row.address,
+            'latitude': row.latitude,
+            'longitude': row.longitude,
+            'status': row.status,
+            'processing_status': row.processing_status,
+            'timestamp': row.timestamp_utc or utc_isoformat(row.timestamp),
         }
 
+    def to_dict(self):
+        return Report.serialize(self)
+
 # Define ScrapedReport Model for external data
 class ScrapedReport(db.Model):
+    __table_args__ = (
+        # Keyset pagination on (date_created, id)
+        db.Index('ix_scraped_report_date_created_id', 'date_created', 'id'),
+        # Open/closed map filters, newest first
+        db.Index('ix_scraped_report_status_normalized_date_created_id', 'status_normalized', 'date_created', 'id'),
+        # Each source has its own id space
+        db.Index('ix_scraped_report_source_source_id', 'source', 'source_id', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     source = db.Column(db.String(50), nullable=False, default='Gainesville_311')
-    source_id = db.Column(db.BigInteger, unique=True, nullable=False)
+    source_id = db.Column(db.BigInteger, nullable=False)
     issue_type = db.Column(db.String(200), nullable=False)
     date_created = db.Column(db.DateTime, nullable=False)
+    # utc_isoformat(date_created), computed once at insert
+    date_created_utc = db.Column(db.String(32), nullable=True, default=_utc_default('date_created'))
     address = db.Column(db.String(255))
     details = db.Column(db.Text)
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
     status = db.Column(db.String(50))
+    # 'open', 'closed' or 'hidden' (NotAnIssue/Cancelled), derived from `status` at ingest
+    status_normalized = db.Column(db.String(10), nullable=True)
     image_url = db.Column(db.String(500), nullable=True)
 
-    def to_dict(self):
-        date_created_iso = None
-        if self.date_created:
-            # If the datetime object is "naive" (has no timezone info),
-            # assume it's in the server's local timezone and convert it to an aware object.
-            if self.date_created.tzinfo is None:
-                dt_aware = self.date_created.astimezone()
-            else:
-                dt_aware = self.date_created
-            # Now convert to UTC and format as ISO 8601, replacing +00:00 with Z for max compatibility
-            date_created_iso = dt_aware.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+    @classmethod
+    def serialized_columns(cls):
+        """The columns read by `serialize`, for column-projected queries."""
+        return (
+            cls.id, cls.source_id, cls.source, cls.issue_type, cls.date_created, cls.date_created_utc,
+            cls.address, cls.details, cls.latitude, cls.longitude, cls.status, cls.image_url,
+        )
 
+    @staticmethod
+    def serialize(row, base_url=None):
+        """Serializes a ScrapedReport, or a row of `serialized_columns`, to a dict."""
         return {
-            'id': self.id,
-            'source_id': self.source_id,
-            'source': self.source,
-            'issue_type': self.issue_type,
-            'date_created': date_created_iso,
-            'address': self.address,
-            'details': self.details,
-            'latitude': self.latitude,
-            'longitude': self.longitude,
-            'status': self.status,
-            'image_url': self.image_url,
+            'id': row.id,
+            'source_id': row.source_id,
+            'source': row.source,
+            'issue_type': row.issue_type,
+            'date_created': row.date_created_utc or utc_isoformat(row.date_created),
+            'address': row.address,
+            'details': row.details,
+            'latitude': row.latitude,
+            'longitude': row.longitude,
+            'status': row.status,
+            'image_url': row.image_url,
         }
+
+    def to_dict(self):
+        return ScrapedReport.serialize(self)
+
+# Tracks incremental scraping progress per external source
+class CollectorState(db.Model):
+    source = db.Column(db.String(50), primary_key=True)
+    # Latest date_created ingested from this source; the next run fetches from here
+    high_water_mark = db.Column(db.DateTime, nullable=True)
+    last_run_at = db.Column(db.DateTime, nullable=True)
+    # Last run that re-fetched back to the oldest open report, to pick up status changes
+    last_resync_at = db.Column(db.DateTime, nullable=True)
+
+# Log of report writes, read by every process's viewport cache to drop stale entries
+class CacheInvalidation(db.Model):
+    # Readers keep the last id they saw, so ids must never be reused after a prune
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    # 'user' or 'scraped'
+    namespace = db.Column(db.String(20), nullable=False)
+    # Location of the changed report; NULL invalidates the whole namespace
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+# Inserts, updates and deletes of reports, appended by triggers (see
+# database/events.py) and tailed by every web process to push live updates
+class ReportEvent(db.Model):
+    # Subscribers keep the last id they saw, so ids must never be reused after a prune
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    # 'user' or 'scraped'
+    source = db.Column(db.String(10), nullable=False)
+    # 'insert', 'update' or 'delete'
+    action = db.Column(db.String(10), nullable=False)
+    report_id = db.Column(db.Integer, nullable=False)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    # 'open', 'closed' or 'hidden' after the write, and before it for updates
+    status = db.Column(db.String(10), nullable=True)
+    previous_status = db.Column(db.String(10), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.current_timestamp())
+
+# Report counts per (source, day, map cell, issue_type, normalized status), kept
+# in sync with report and scraped_report by triggers (see database/rollups.py)
+class IssueRollup(db.Model):
+    __table_args__ = (
+        db.Index('ix_issue_rollup_bucket', 'bucket'),
+    )
+
+    # 'user' or 'scraped'
+    source = db.Column(db.String(10), primary_key=True)
+    bucket = db.Column(db.Date, primary_key=True)
+    # Grid indexes of the cell: floor((lat + 90) / ROLLUP_CELL_SIZE), floor((lng + 180) / ROLLUP_CELL_SIZE)
+    cell_lat = db.Column(db.Integer, primary_key=True)
+    cell_lng = db.Column(db.Integer, primary_key=True)
+    issue_type = db.Column(db.String(200), primary_key=True)
+    # 'open', 'closed' or 'hidden'
+    status = db.Column(db.String(10), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
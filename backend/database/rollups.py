@@ -0,0 +1,177 @@
+from sqlalchemy import text
+from . import db
+from .models import IssueRollup
+from .filters import issue_type_filter
+
+# Rollup cells are about 1.1km on a side. The size is baked into the triggers
+# and stored rows; after changing it, drop the *_rollup_* triggers and run
+# `flask rebuild-rollups`.
+ROLLUP_CELL_SIZE = 0.01
+INTERVALS = ('day', 'week', 'month', 'total')
+GROUP_BY_FIELDS = ('cell', 'issue_type', 'status', 'source')
+
+# Per source table: the rollup source name and SQL expressions over a row alias
+ROLLUP_SOURCES = {
+    'report': {
+        'source': 'user',
+        'bucket': 'date({row}.timestamp)',
+        # Same open/closed split as the status filters on /user_reports
+        'status': "CASE WHEN {row}.status = 'closed' THEN 'closed' ELSE 'open' END",
+        'watched': 'issue_type, status, latitude, longitude, timestamp',
+    },
+    'scraped_report': {
+        'source': 'scraped',
+        'bucket': 'date({row}.date_created)',
+        'status': "COALESCE({row}.status_normalized, 'hidden')",
+        'watched': 'issue_type, status_normalized, latitude, longitude, date_created',
+    },
+}
+
+def _key_columns(spec, row):
+    return (
+        f"'{spec['source']}', {spec['bucket'].format(row=row)}, "
+        f"CAST(({row}.latitude + 90.0) / {ROLLUP_CELL_SIZE} AS INTEGER), "
+        f"CAST(({row}.longitude + 180.0) / {ROLLUP_CELL_SIZE} AS INTEGER), "
+        f"{row}.issue_type, {spec['status'].format(row=row)}"
+    )
+
+def _counted(spec, row):
+    # Rows without coordinates or a date (old reports without a timestamp) have no rollup key.
+    return (
+        f"{row}.latitude IS NOT NULL AND {row}.longitude IS NOT NULL "
+        f"AND {spec['bucket'].format(row=row)} IS NOT NULL"
+    )
+
+def _add_statement(spec, row):
+    return (
+        f"INSERT INTO issue_rollup (source, bucket, cell_lat, cell_lng, issue_type, status, count) "
+        f"SELECT {_key_columns(spec, row)}, 1 WHERE {_counted(spec, row)} "
+        f"ON CONFLICT (source, bucket, cell_lat, cell_lng, issue_type, status) DO UPDATE SET count = count + 1;"
+    )
+
+def _remove_statements(spec, row):
+    match = (
+        f"(source, bucket, cell_lat, cell_lng, issue_type, status) = ({_key_columns(spec, row)}) "
+        f"AND {_counted(spec, row)}"
+    )
+    return (
+        f"UPDATE issue_rollup SET count = count - 1 WHERE {match}; "
+        f"DELETE FROM issue_rollup WHERE {match} AND count <= 0;"
+    )
+
+def _rebuild_statement(table, spec):
+    return (
+        f"INSERT INTO issue_rollup (source, bucket, cell_lat, cell_lng, issue_type, status, count) "
+        f"SELECT {_key_columns(spec, 'r')}, count(*) FROM {table} AS r "
+        f"WHERE {_counted(spec, 'r')} "
+        f"GROUP BY 1, 2, 3, 4, 5, 6"
+    )
+
+def init_rollups(connection):
+    """
+    Creates the triggers that keep issue_rollup in sync with every write to
+    the report tables (ORM, bulk inserts and updates, raw SQL), and fills the
+    rollup table the first time.
+    """
+    is_new = connection.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'report_rollup_insert'"
+    )).first() is None
+
+    for table, spec in ROLLUP_SOURCES.items():
+        # Triggers from before rows without a date were skipped are recreated.
+        for name, row in ((f'{table}_rollup_insert', 'new'), (f'{table}_rollup_delete', 'old'), (f'{table}_rollup_update', 'old')):
+            sql = connection.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = :name"), {'name': name}
+            ).scalar()
+            if sql is not None and _counted(spec, row) not in sql:
+                connection.execute(text(f"DROP TRIGGER {name}"))
+
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_rollup_insert AFTER INSERT ON {table}
+            BEGIN
+                {_add_statement(spec, 'new')}
+            END
+        """))
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_rollup_delete AFTER DELETE ON {table}
+            BEGIN
+                {_remove_statements(spec, 'old')}
+            END
+        """))
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_rollup_update AFTER UPDATE OF {spec['watched']} ON {table}
+            BEGIN
+                {_remove_statements(spec, 'old')}
+                {_add_statement(spec, 'new')}
+            END
+        """))
+
+    if is_new:
+        rebuild_rollups(connection)
+
+def rebuild_rollups(connection):
+    """Recomputes issue_rollup from the report tables."""
+    connection.execute(text("DELETE FROM issue_rollup"))
+    for table, spec in ROLLUP_SOURCES.items():
+        connection.execute(text(_rebuild_statement(table, spec)))
+
+def cell_index(lat, lng):
+    return int((lat + 90.0) / ROLLUP_CELL_SIZE), int((lng + 180.0) / ROLLUP_CELL_SIZE)
+
+def issue_counts(interval='day', group_by=(), date_from=None, date_to=None, bbox=None,
+                 sources=None, issue_type=None, statuses=('open', 'closed')):
+    """
+    Sums the rollup counts per time bucket and the `group_by` fields. The
+    cost depends on the number of rollup rows matched, not on the size of
+    the report tables. A bbox selects every cell it overlaps.
+    """
+    if interval == 'week':
+        # The Monday on or before the day
+        bucket = db.func.date(IssueRollup.bucket, '-6 days', 'weekday 1')
+    elif interval == 'month':
+        bucket = db.func.strftime('%Y-%m-01', IssueRollup.bucket)
+    elif interval == 'day':
+        bucket = db.func.date(IssueRollup.bucket)
+    else:
+        bucket = None
+
+    fields = {
+        'cell': (IssueRollup.cell_lat, IssueRollup.cell_lng),
+        'issue_type': (IssueRollup.issue_type,),
+        'status': (IssueRollup.status,),
+        'source': (IssueRollup.source,),
+    }
+    group_columns = ([bucket.label('bucket')] if bucket is not None else []) + [
+        column for field in group_by for column in fields[field]
+    ]
+    query = db.select(*group_columns, db.func.sum(IssueRollup.count).label('count'))
+    if group_columns:
+        query = query.group_by(*group_columns).order_by(*group_columns)
+
+    if date_from:
+        query = query.where(IssueRollup.bucket >= date_from)
+    if date_to:
+        query = query.where(IssueRollup.bucket <= date_to)
+    if bbox is not None:
+        (south, west), (north, east) = cell_index(bbox[0], bbox[1]), cell_index(bbox[2], bbox[3])
+        query = query.where(IssueRollup.cell_lat.between(south, north), IssueRollup.cell_lng.between(west, east))
+    if sources:
+        query = query.where(IssueRollup.source.in_(sources))
+    if issue_type:
+        query = query.where(issue_type_filter(IssueRollup.issue_type, issue_type))
+    if statuses:
+        query = query.where(IssueRollup.status.in_(statuses))
+
+    results = []
+    for row in db.session.execute(query):
+        item = {'count': row.count or 0}
+        if bucket is not None:
+            item['bucket'] = row.bucket
+        if 'cell' in group_by:
+            item['latitude'] = round((row.cell_lat + 0.5) * ROLLUP_CELL_SIZE - 90.0, 6)
+            item['longitude'] = round((row.cell_lng + 0.5) * ROLLUP_CELL_SIZE - 180.0, 6)
+        for field in ('issue_type', 'status', 'source'):
+            if field in group_by:
+                item[field] = getattr(row, field)
+        results.append(item)
+    return results
@@ -0,0 +1,78 @@
+from sqlalchemy import text
+from . import db
+
+# FTS5 indexes over the searchable text columns of each report table. They are
+# external-content tables (the text lives only in the report tables) and use the
+# trigram tokenizer, so a MATCH behaves like the case-insensitive substring
+# search the endpoint always offered, but is answered from the index.
+SEARCH_INDEXES = {
+    'report_fts': ('report', ['issue_type', 'user_defined_issue_type', 'details', 'address']),
+    'scraped_report_fts': ('scraped_report', ['issue_type', 'details', 'address']),
+}
+
+def _fts_exists(connection, fts):
+    row = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': fts}
+    ).first()
+    return row is not None
+
+def init_search_index(connection):
+    """Creates the FTS5 tables and sync triggers, rebuilding newly created indexes."""
+    for fts, (table, columns) in SEARCH_INDEXES.items():
+        is_new = not _fts_exists(connection, fts)
+        column_list = ', '.join(columns)
+        new_values = ', '.join(f"new.{c}" for c in columns)
+        old_values = ', '.join(f"old.{c}" for c in columns)
+
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{column_list}, content='{table}', content_rowid='id', tokenize='trigram')"
+        ))
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values});
+            END
+        """))
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {column_list} ON {table}
+            BEGIN
+                INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values});
+            END
+        """))
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+            END
+        """))
+
+        if is_new:
+            # Index rows that were written before the FTS table existed.
+            connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+def full_text_search(query_str, limit=50):
+    """
+    Searches both report tables and returns up to `limit` (type, id) pairs.
+
+    The query is matched as a single phrase. Results from both tables are
+    merged newest first and limited in SQL, so only the returned rows are ever
+    loaded. They are not merged on bm25: each FTS table scores against its own
+    corpus statistics, so scores from the two tables don't compare.
+    """
+    phrase = '"' + query_str.replace('"', '""') + '"'
+    stmt = text("""
+        SELECT 'user' AS type, report.id AS id, report.timestamp AS created
+        FROM report_fts JOIN report ON report.id = report_fts.rowid
+        WHERE report_fts MATCH :phrase
+        UNION ALL
+        SELECT 'scraped', scraped_report.id, scraped_report.date_created
+        FROM scraped_report_fts JOIN scraped_report ON scraped_report.id = scraped_report_fts.rowid
+        WHERE scraped_report_fts MATCH :phrase
+        ORDER BY created DESC, id DESC
+        LIMIT :limit
+    """)
+    rows = db.session.execute(stmt, {'phrase': phrase, 'limit': limit})
+    return [(row.type, row.id) for row in rows]
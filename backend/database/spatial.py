@@ -0,0 +1,83 @@
+from sqlalchemy import text
+from . import db
+
+# Each report table gets an R*Tree companion keyed on the report id. Points are
+# stored as degenerate boxes (min == max) and kept in sync with triggers, so
+# every write path (ORM, bulk inserts, raw SQL) updates the index.
+SPATIAL_INDEXES = {
+    'report': 'report_rtree',
+    'scraped_report': 'scraped_report_rtree',
+}
+
+def _rtree_exists(connection, rtree):
+    row = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': rtree}
+    ).first()
+    return row is not None
+
+def init_spatial_index(connection):
+    """Creates the R*Tree tables and sync triggers, backfilling newly created indexes."""
+    for table, rtree in SPATIAL_INDEXES.items():
+        is_new = not _rtree_exists(connection, rtree)
+
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {rtree} "
+            f"USING rtree(id, min_lat, max_lat, min_lng, max_lng)"
+        ))
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {rtree}_insert AFTER INSERT ON {table}
+            WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL
+            BEGIN
+                INSERT OR REPLACE INTO {rtree} VALUES
+                    (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+            END
+        """))
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {rtree}_update AFTER UPDATE OF latitude, longitude ON {table}
+            BEGIN
+                DELETE FROM {rtree} WHERE id = old.id;
+                INSERT INTO {rtree}
+                    SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+                    WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+            END
+        """))
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {rtree}_delete AFTER DELETE ON {table}
+            BEGIN
+                DELETE FROM {rtree} WHERE id = old.id;
+            END
+        """))
+
+        if is_new:
+            # Index rows that were written before the R*Tree existed.
+            connection.execute(text(f"""
+                INSERT INTO {rtree}
+                    SELECT id, latitude, latitude, longitude, longitude FROM {table}
+                    WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+            """))
+
+def bbox_filter(model, sw_lat, sw_lng, ne_lat, ne_lng):
+    """
+    Returns filter clauses restricting `model` to the given bounding box.
+
+    The R*Tree lookup narrows the candidates to ids inside the box; the exact
+    `between` checks are then applied to those rows only, since the R*Tree
+    stores 32-bit coordinates rounded outwards.
+    """
+    rtree = db.table(
+        SPATIAL_INDEXES[model.__tablename__],
+        db.column('id'), db.column('min_lat'), db.column('max_lat'),
+        db.column('min_lng'), db.column('max_lng'),
+    )
+    candidate_ids = db.select(rtree.c.id).where(
+        rtree.c.max_lat >= sw_lat,
+        rtree.c.min_lat <= ne_lat,
+        rtree.c.max_lng >= sw_lng,
+        rtree.c.min_lng <= ne_lng,
+    )
+    return (
+        model.id.in_(candidate_ids),
+        model.latitude.between(sw_lat, ne_lat),
+        model.longitude.between(sw_lng, ne_lng),
+    )
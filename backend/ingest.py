@@ -0,0 +1,110 @@
+import os
+import threading
+import click
+from concurrent.futures import ThreadPoolExecutor
+from flask.cli import with_appcontext
+from database import db
+from database.models import Report
+from utils.geolocate import reverse_geocode
+from utils.viewport_cache import invalidate_reports
+from ml_model.classify import classify_image, classify_path
+from utils.image_store import generate_derivatives, derivative_filename, THUMBNAIL_SIZE
+from utils.metrics import stage
+
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', 4))
+MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 2.0  # seconds, doubled after every failed attempt
+UNCLASSIFIED = 'unclassified'
+
+def _finish(report, processing_status):
+    """Sets a terminal processing_status and commits, dropping the cached map lists that show the report."""
+    report.processing_status = processing_status
+    invalidate_reports('user', [(report.latitude, report.longitude)])
+    with stage('commit'):
+        db.session.commit()
+
+def process_report(report_id, upload=None):
+    """
+    Runs the slow steps of a report submission and marks the report as ready.
+
+    `upload` is the request's ProcessedUpload, whose decoded image is reused;
+    without it (e.g. after a restart) the stored original is decoded instead.
+    Every step is skipped when its output is already on the row, so a retry
+    only redoes the work that did not complete.
+    """
+    report = db.session.get(Report, report_id)
+    if report is None:
+        return
+
+    if not report.thumbnail_filename:
+        # All derivative sizes come from one decode; the 400px JPEG doubles as the thumbnail
+        image = upload.image if upload else None
+        with stage('thumbnail'):
+            generate_derivatives(report.image_hash, report.image_filename, image)
+        report.thumbnail_filename = derivative_filename(report.image_hash, THUMBNAIL_SIZE, 'jpg')
+        with stage('commit'):
+            db.session.commit()
+
+    if not report.address:
+        # Retrieve address of issue from coordinates
+        with stage('geocode'):
+            report.address = reverse_geocode(report.latitude, report.longitude)
+        with stage('commit'):
+            db.session.commit()
+
+    if report.issue_type == UNCLASSIFIED:
+        if upload:
+            label = classify_image(upload.image)
+        else:
+            label = classify_path(os.path.join('uploads', report.image_filename))
+        report.issue_type = label or UNCLASSIFIED
+        with stage('commit'):
+            db.session.commit()
+
+    # The thumbnail, address and issue_type all show up in the cached map lists.
+    _finish(report, 'ready')
+
+class IngestPipeline:
+    """Background worker pool that finishes `pending` reports after POST /report returns."""
+
+    def __init__(self, max_workers=INGEST_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ingest')
+
+    def submit(self, app, report_id, upload=None, attempt=1):
+        self._executor.submit(self._run, app, report_id, upload, attempt)
+
+    def _run(self, app, report_id, upload, attempt):
+        with app.app_context():
+            try:
+                process_report(report_id, upload)
+            except Exception as e:
+                db.session.rollback()
+                if attempt < MAX_ATTEMPTS:
+                    delay = RETRY_BASE_DELAY * 2 ** (attempt - 1)
+                    print(f"Processing report {report_id} failed (attempt {attempt}): {e}. Retrying in {delay:.0f}s.")
+                    timer = threading.Timer(delay, self.submit, args=(app, report_id, upload, attempt + 1))
+                    timer.daemon = True
+                    timer.start()
+                    return
+                print(f"Processing report {report_id} failed after {attempt} attempts: {e}")
+                report = db.session.get(Report, report_id)
+                if report is not None:
+                    _finish(report, 'failed')
+
+ingest_pipeline = IngestPipeline()
+
+@click.command('process-pending-reports')
+@with_appcontext
+def process_pending_reports_command():
+    """Processes reports left pending or failed, e.g. after a restart."""
+    reports = Report.query.filter(Report.processing_status.in_(['pending', 'failed'])).all()
+    print(f"Processing {len(reports)} pending reports...")
+    for report in reports:
+        try:
+            process_report(report.id)
+        except Exception as e:
+            db.session.rollback()
+            print(f"  - Report {report.id} failed: {e}")
+
+def register_ingest(app):
+    app.cli.add_command(process_pending_reports_command)
@@ -0,0 +1,82 @@
+import io
+import requests
+
+# YOLO class index -> issue_type
+CLASSES = {0: 'trash', 1: 'pothole'}
+# Same default confidence threshold as ultralytics' predict()
+CONFIDENCE_THRESHOLD = 0.25
+
+class UltralyticsBackend:
+    """Runs the PyTorch checkpoint through ultralytics. Imports torch on first load."""
+
+    def __init__(self, model_path, imgsz=640):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.imgsz = imgsz
+
+    def predict(self, images):
+        results = self.model(images, imgsz=self.imgsz, verbose=False)   # one forward pass for the batch
+        labels = []
+        for result in results:
+            pred_idx = int(result.boxes.cls[0]) if result.boxes else None
+            labels.append(CLASSES.get(pred_idx))
+        return labels
+
+class OnnxBackend:
+    """
+    Runs a YOLOv8-style ONNX export on the CPU with ONNX Runtime.
+
+    Images are letterboxed to `imgsz` and stacked into one batch, so the model
+    must be exported with a dynamic batch axis (see `flask export-onnx`). The
+    label is the class of the highest-scoring detection, which is the same box
+    ultralytics would report first.
+    """
+
+    def __init__(self, model_path, imgsz=640, threads=None):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        self.imgsz = imgsz
+
+    def _letterbox(self, image):
+        from PIL import Image
+        scale = self.imgsz / max(image.size)
+        resized = image.resize((round(image.width * scale), round(image.height * scale)), Image.BILINEAR)
+        canvas = Image.new('RGB', (self.imgsz, self.imgsz), (114, 114, 114))
+        canvas.paste(resized, ((self.imgsz - resized.width) // 2, (self.imgsz - resized.height) // 2))
+        return canvas
+
+    def predict(self, images):
+        import numpy as np
+        batch = np.stack([np.asarray(self._letterbox(image), dtype=np.float32) for image in images])
+        batch = batch.transpose(0, 3, 1, 2) / 255.0   # NHWC -> NCHW, scaled to [0, 1]
+
+        # Output is (batch, 4 box coords + one score per class, anchors)
+        output = self.session.run(None, {self.input_name: batch})[0]
+        class_scores = output[:, 4:, :].max(axis=2)   # best score per class, per image
+        labels = []
+        for scores in class_scores:
+            pred_idx = int(scores.argmax())
+            labels.append(CLASSES.get(pred_idx) if scores[pred_idx] >= CONFIDENCE_THRESHOLD else None)
+        return labels
+
+class RemoteBackend:
+    """Sends batches to a shared inference process started with `flask serve-inference`."""
+
+    def __init__(self, url, timeout=30):
+        self.url = url.rstrip('/') + '/predict'
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def predict(self, images):
+        files = []
+        for i, image in enumerate(images):
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=90)
+            files.append(('images', (f'{i}.jpg', buffer.getvalue(), 'image/jpeg')))
+        response = self.session.post(self.url, files=files, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()['labels']
@@ -0,0 +1,99 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+class BatchingInferenceWorker:
+    """
+    Collects inference requests from many threads into batches.
+
+    Callers `submit()` an input and get a Future back. A single background thread
+    takes the first queued input, then keeps collecting until `max_batch_size`
+    inputs are queued or `max_wait` seconds have passed, and runs
+    `predict_batch(inputs)` once for the whole batch. `predict_batch` must return
+    one result per input, in order.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=8, max_wait=0.01):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._batch_sizes = {}
+        self._inference_seconds = 0.0
+        self._errors = 0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, item):
+        """Queues one input and returns a Future resolving to its prediction."""
+        self.start()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+
+            start = time.perf_counter()
+            try:
+                results = list(self.predict_batch(items))
+                # A short result list would leave callers waiting forever.
+                if len(results) != len(items):
+                    raise RuntimeError(f"predict_batch returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                with self._stats_lock:
+                    self._errors += 1
+                continue
+            elapsed = time.perf_counter() - start
+
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+                self._inference_seconds += elapsed
+
+    def stats(self):
+        """Returns queue depth and batching statistics since startup."""
+        with self._stats_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'batches': self._batches,
+                'items': self._items,
+                'errors': self._errors,
+                'mean_batch_size': self._items / self._batches if self._batches else 0.0,
+                'batch_size_counts': dict(sorted(self._batch_sizes.items())),
+                'inference_seconds': self._inference_seconds,
+            }
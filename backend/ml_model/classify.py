@@ -1,31 +1,122 @@
 import os
+import threading
 import time
-from ultralytics import YOLO
+import click
+from flask import Flask, request, jsonify
+from werkzeug.serving import run_simple
 from PIL import Image
-import io
+
+from ml_model.batching import BatchingInferenceWorker
+from utils.upload_processing import decode_image
+from utils.metrics import stage
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(BASE_DIR, "best.pt")
 
-# Load model once
-model = YOLO(MODEL_PATH)
-correct_classes = {0: 'trash', 1: 'pothole'}
-
-def classify_image(image_file):
-        # image_file is a Flask FileStorage
-    image_file.stream.seek(0)        # ensure pointer at start
-    img_bytes = image_file.read()    # read bytes
-    image_file.stream.seek(0)        # reset so caller can reuse (save etc.)
-
-    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-
-    print("🟡 Running YOLO detection...")
-    start = time.time()
-    results = model(img)
-    print(f"✅ YOLO finished in {time.time() - start:.2f} seconds")
-    
-    result = results[0]   # get first result object
-    pred_idx = int(result.boxes.cls[0]) if result.boxes else None
-    label = correct_classes[pred_idx] if pred_idx in correct_classes else None
-    
-    return label if label else None
\ No newline at end of file
+# 'ultralytics' (PyTorch), 'onnx' (ONNX Runtime on the CPU) or 'remote'
+# (a shared process started with `flask serve-inference`)
+BACKEND = os.environ.get('CLASSIFIER_BACKEND', 'ultralytics')
+ONNX_PATH = os.environ.get('CLASSIFIER_ONNX_PATH', os.path.join(BASE_DIR, "best.onnx"))
+IMGSZ = int(os.environ.get('CLASSIFIER_IMGSZ', 640))
+REMOTE_URL = os.environ.get('CLASSIFIER_REMOTE_URL', 'http://127.0.0.1:5001')
+
+# Batching limits for concurrent /classify requests.
+MAX_BATCH_SIZE = int(os.environ.get('CLASSIFY_MAX_BATCH_SIZE', 8))
+MAX_WAIT_MS = float(os.environ.get('CLASSIFY_MAX_WAIT_MS', 10))
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def _load_backend():
+    from ml_model.backends import UltralyticsBackend, OnnxBackend, RemoteBackend
+    if BACKEND == 'onnx':
+        return OnnxBackend(ONNX_PATH, imgsz=IMGSZ)
+    if BACKEND == 'remote':
+        return RemoteBackend(REMOTE_URL)
+    return UltralyticsBackend(MODEL_PATH, imgsz=IMGSZ)
+
+def get_worker():
+    """
+    Returns the shared batching worker, loading the model on first use.
+
+    Nothing heavy is imported until then, so importing this module (and the
+    routes and CLI commands that do) stays cheap.
+    """
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                print(f"🟡 Loading {BACKEND} classifier...")
+                start = time.time()
+                backend = _load_backend()
+                print(f"✅ Classifier loaded in {time.time() - start:.2f} seconds")
+
+                def predict_batch(images):
+                    with stage('classify_batch'):
+                        return backend.predict(images)
+
+                # All requests share one worker, so concurrent calls are batched together
+                # instead of contending for the model one image at a time.
+                _worker = BatchingInferenceWorker(
+                    predict_batch,
+                    max_batch_size=MAX_BATCH_SIZE,
+                    max_wait=MAX_WAIT_MS / 1000.0,
+                )
+    return _worker
+
+def warm_up():
+    """Loads the model and runs one dummy inference so the first request doesn't pay for it."""
+    get_worker().submit(Image.new("RGB", (IMGSZ, IMGSZ))).result()
+
+def classify_image(img):
+    # img is an already decoded RGB PIL image (see utils.upload_processing)
+    with stage('classify'):   # includes the wait for a batch slot
+        return get_worker().submit(img).result()
+
+def classify_path(path):
+    return classify_image(decode_image(path))
+
+def inference_stats():
+    if _worker is None:
+        return {'loaded': False, 'backend': BACKEND}
+    return {'loaded': True, 'backend': BACKEND, **_worker.stats()}
+
+@click.command('export-onnx')
+@click.option('--imgsz', default=IMGSZ, show_default=True, help='Square input size baked into the export.')
+def export_onnx_command(imgsz):
+    """Exports best.pt to ONNX with a dynamic batch axis for CLASSIFIER_BACKEND=onnx."""
+    from ultralytics import YOLO
+    path = YOLO(MODEL_PATH).export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+    print(f"Exported {path}. Set CLASSIFIER_IMGSZ={imgsz} when serving it.")
+
+@click.command('serve-inference')
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', default=5001, show_default=True)
+def serve_inference_command(host, port):
+    """
+    Runs a single inference process shared by all web workers, which reach it
+    with CLASSIFIER_BACKEND=remote. Requests from every worker are batched together.
+    """
+    if BACKEND == 'remote':
+        raise click.UsageError("The inference server needs a local backend; set CLASSIFIER_BACKEND to ultralytics or onnx.")
+    server = Flask('inference')
+
+    @server.route('/predict', methods=['POST'])
+    def predict():
+        futures = [get_worker().submit(Image.open(f.stream).convert("RGB")) for f in request.files.getlist('images')]
+        return jsonify({'labels': [future.result() for future in futures]})
+
+    @server.route('/stats', methods=['GET'])
+    def stats():
+        return jsonify(inference_stats())
+
+    warm_up()
+    # app.run() is a no-op inside a `flask` CLI command, so serve with werkzeug directly.
+    run_simple(host, port, server, threaded=True)
+
+def register_classifier(app):
+    app.cli.add_command(export_onnx_command)
+    app.cli.add_command(serve_inference_command)
+    if app.config.get('CLASSIFIER_WARMUP'):
+        # Load in the background so startup isn't blocked on torch.
+        threading.Thread(target=warm_up, name='classifier-warmup', daemon=True).start()
@@ -1,10 +1,19 @@
 from flask import Blueprint, request, jsonify
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from sqlalchemy.exc import IntegrityError
 from werkzeug.security import generate_password_hash, check_password_hash
 from database import db
 from database.models import User
 
 auth_bp = Blueprint('auth', __name__)
 
+def _tokens(user_id):
+    # The identity (JWT "sub") must be a string
+    return {
+        'access_token': create_access_token(identity=str(user_id)),
+        'refresh_token': create_refresh_token(identity=str(user_id)),
+    }
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -16,21 +25,21 @@ def register():
     if not username or not email or not password:
         return jsonify({'error': 'Missing required fields'}), 400
 
-    if User.query.filter_by(username=username).first():
-        return jsonify({'error': 'Username already exists'}), 400
-    
-    if User.query.filter_by(email=email).first():
-        return jsonify({'error': 'Email already exists'}), 400
-
     # Hash the password
     hashed_password = generate_password_hash(password)
 
     new_user = User(username=username, email=email, password_hash=hashed_password)
     
+    # A single INSERT; the unique constraints on username and email reject duplicates.
     try:
         db.session.add(new_user)
         db.session.commit()
         return jsonify({'message': 'User registered successfully', 'user_id': new_user.id}), 201
+    except IntegrityError as e:
+        db.session.rollback()
+        if 'user.email' in str(e.orig):
+            return jsonify({'error': 'Email already exists'}), 400
+        return jsonify({'error': 'Username already exists'}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -50,7 +59,14 @@ def login():
     if user and check_password_hash(user.password_hash, password):
         return jsonify({
             'message': 'Login successful',
-            'user': {'id': user.id, 'username': user.username, 'email': user.email}
+            'user': {'id': user.id, 'username': user.username, 'email': user.email},
+            **_tokens(user.id),
         }), 200
     
-    return jsonify({'error': 'Invalid credentials'}), 401
\ No newline at end of file
+    return jsonify({'error': 'Invalid credentials'}), 401
+
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    """Exchanges a refresh token (in the Authorization header) for a new access token."""
+    return jsonify({'access_token': create_access_token(identity=get_jwt_identity())}), 200
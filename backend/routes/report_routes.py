@@ -1,20 +1,178 @@
-from flask import request, jsonify, send_from_directory, Blueprint
+from flask import request, jsonify, send_from_directory, Blueprint, current_app, abort, stream_with_context
 import os
-import uuid
-from datetime import datetime
+import itertools
+import mimetypes
+from datetime import date
 
 from database import db
-from database.models import Report, User, ScrapedReport
-from utils.geolocate import reverse_geocode
-from PIL import Image as PILImage
-from ml_model.classify import classify_image
+from database.models import Report, User, ScrapedReport, media_base_url
+from database.spatial import bbox_filter
+from database.filters import report_status_filters, scraped_status_filters, issue_type_filter
+from database.search import full_text_search
+from database.rollups import issue_counts, INTERVALS, GROUP_BY_FIELDS, ROLLUP_CELL_SIZE
+from utils.clustering import cluster_reports, bbox_cell_count, MAX_CELLS
+from utils.nearby import nearest_reports, MAX_RADIUS_M
+from utils.export import export_sources, export_reports, gzip_chunks, FORMATS
+from utils.pagination import paginate, page_size, encode_cursor, decode_cursor
+from utils.viewport_cache import viewport_cache, snap_bbox, invalidate_reports, CachedRow, MAX_CACHED_ROWS
+from utils.live import live_events, event_stream, TooManySubscribers
+from utils.image_store import store_upload, select_derivative, release_image, THUMBNAIL_SIZE
+from utils.upload_processing import ProcessedUpload, UploadTooLarge
+from utils.metrics import stage
+from utils.auth import token_user_id, legacy_user_id_allowed
+from utils.staging import stage_upload, load_staged_upload, cached_prediction, InvalidUploadToken, STAGING_TTL
+from ingest import ingest_pipeline, UNCLASSIFIED
+from ml_model.classify import classify_image, inference_stats
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+UPLOAD_MAX_AGE = 365 * 24 * 60 * 60  # one year
+# Open reports of the same type this close to a new one are returned as possible duplicates
+DUPLICATE_RADIUS_M = 50
+DUPLICATE_LIMIT = 5
+MAX_NEARBY_RESULTS = 100
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def nearby_sources(source='all', status=None, issue_type=None):
+    """Builds the (type, model, filters) sources for nearest_reports."""
+    sources = []
+    for report_type, model, status_filters in (
+        ('user', Report, report_status_filters),
+        ('scraped', ScrapedReport, scraped_status_filters),
+    ):
+        if source not in ('all', report_type):
+            continue
+        filters = status_filters(status)
+        if issue_type:
+            filters.append(issue_type_filter(model.issue_type, issue_type))
+        sources.append((report_type, model, filters))
+    return sources
+
+def _parse_source():
+    """The `source` query parameter (all, user or scraped). Raises ValueError if it is invalid."""
+    source = request.args.get('source', 'all')
+    if source not in ('all', 'user', 'scraped'):
+        raise ValueError('source must be one of all, user, scraped')
+    return source
+
+def _parse_bbox_args(required=False):
+    """The sw_lat, sw_lng, ne_lat, ne_lng query parameters, or None if absent. Raises ValueError if incomplete."""
+    bbox = tuple(request.args.get(name, type=float) for name in ('sw_lat', 'sw_lng', 'ne_lat', 'ne_lng'))
+    if all(value is None for value in bbox) and not required:
+        return None
+    if None in bbox:
+        raise ValueError('Missing bounding box' if required else 'Incomplete bounding box')
+    return bbox
+
+def _parse_date_args():
+    """The date_from and date_to query parameters as dates (None if absent). Raises ValueError if malformed."""
+    try:
+        date_from = date.fromisoformat(request.args['date_from']) if request.args.get('date_from') else None
+        date_to = date.fromisoformat(request.args['date_to']) if request.args.get('date_to') else None
+    except ValueError:
+        raise ValueError('date_from and date_to must be YYYY-MM-DD dates') from None
+    return date_from, date_to
+
+def _paginated_response(query, model, sort_column, id_column):
+    """
+    Returns one page of `query`, newest first, as a JSON list. The page size
+    comes from the `limit` query parameter; the cursor for the next page is
+    sent in the X-Next-Cursor header and passed back as `cursor`.
+
+    Only the serialized columns are selected, and rows are serialized straight
+    from the result tuples without building ORM objects.
+    """
+    try:
+        rows, next_cursor = paginate(
+            query.with_entities(*model.serialized_columns()), sort_column, id_column,
+            cursor=request.args.get('cursor'),
+            limit=page_size(request.args.get('limit', type=int)),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    base_url = media_base_url()
+    response = jsonify([model.serialize(row, base_url) for row in rows])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+def _region_rows(model, sort_column, region, filters):
+    """
+    The reports of a snapped region as CachedRows, newest first, or None if
+    the region holds more than MAX_CACHED_ROWS of them.
+    """
+    query = model.query.filter(*filters)
+    if region is not None:
+        query = query.filter(*bbox_filter(model, *region))
+    rows = (
+        query.with_entities(*model.serialized_columns())
+        .order_by(sort_column.desc(), model.id.desc())
+        .limit(MAX_CACHED_ROWS + 1)
+        .all()
+    )
+    if len(rows) > MAX_CACHED_ROWS:
+        return None
+    base_url = media_base_url()
+    return [
+        CachedRow(getattr(row, sort_column.key), row.id, row.latitude, row.longitude,
+                  current_app.json.dumps(model.serialize(row, base_url)).encode())
+        for row in rows
+    ]
+
+def _sort_key(sort_value, row_id):
+    # Matches the SQL order: newest first, then rows with a NULL sort value.
+    return (sort_value is not None, sort_value, row_id)
+
+def _viewport_response(namespace, model, sort_column, bbox, filters):
+    """
+    Serves a map list endpoint through the viewport cache. The bbox is snapped
+    outwards to the cache's tile grid so that nearby viewports share an entry
+    holding every report of the snapped region. Each response filters those
+    to the exact bbox before applying the cursor and limit, so it only ever
+    holds reports inside the requested bbox. Regions with too many reports
+    to cache, or every request when the cache is disabled, are paginated in
+    SQL instead.
+    """
+    try:
+        cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limit = page_size(request.args.get('limit', type=int))
+
+    region = snap_bbox(*bbox) if bbox is not None else None
+    key = (namespace, region, request.args.get('status'))
+    rows = viewport_cache.get(key) if viewport_cache.max_bytes > 0 else None
+    cache_status = 'HIT'
+    if rows is None:
+        rows = _region_rows(model, sort_column, region, filters) if viewport_cache.max_bytes > 0 else None
+        if rows is None:
+            query = model.query.filter(*filters)
+            if bbox is not None:
+                query = query.filter(*bbox_filter(model, *bbox))
+            return _paginated_response(query, model, sort_column, model.id)
+        viewport_cache.put(key, namespace, region, rows)
+        cache_status = 'MISS'
+
+    if bbox is not None:
+        sw_lat, sw_lng, ne_lat, ne_lng = bbox
+        rows = (r for r in rows if sw_lat <= r.latitude <= ne_lat and sw_lng <= r.longitude <= ne_lng)
+    if cursor is not None:
+        after = _sort_key(*cursor)
+        rows = (r for r in rows if _sort_key(r.sort_value, r.id) < after)
+    page = list(itertools.islice(rows, limit + 1))
+
+    response = current_app.response_class(
+        b'[' + b','.join(r.body for r in page[:limit]) + b']', mimetype='application/json'
+    )
+    if len(page) > limit:
+        last = page[limit - 1]
+        response.headers['X-Next-Cursor'] = encode_cursor(last.sort_value, last.id)
+    response.headers['X-Cache'] = cache_status
+    return response
+
 report_bp = Blueprint('report', __name__)
 
 @report_bp.route('/classify', methods=['POST'])
@@ -27,30 +185,58 @@ def classify_endpoint():
         return jsonify({'error': 'No selected file'}), 400
     
     try:
-        issue_type = classify_image(img)
-        return jsonify({'issue_type': issue_type})
+        upload = ProcessedUpload(img)
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+
+    try:
+        # The same photo classified again (e.g. a retried request) reuses the staged prediction.
+        found, issue_type = cached_prediction(upload.content_hash)
+        if not found:
+            issue_type = classify_image(upload.image)
+        if not allowed_file(img.filename):
+            return jsonify({'issue_type': issue_type})
+
+        # Keep the upload so POST /report can reference it by token instead of sending it again.
+        token = stage_upload(upload, issue_type)
+        return jsonify({'issue_type': issue_type, 'upload_token': token, 'expires_in': STAGING_TTL})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    finally:
+        upload.discard()
+
+@report_bp.route('/classify/stats', methods=['GET'])
+def classify_stats():
+    return jsonify(inference_stats())
 
 @report_bp.route('/report', methods=['POST'])
 def report_issue():
 
-    if 'image' not in request.files:
+    # Either the image itself, or the upload_token /classify returned for it.
+    upload_token = request.form.get('upload_token')
+    if 'image' not in request.files and not upload_token:
         return jsonify({'error': 'No file part'}), 400
     
-    user_id = request.form.get('user_id')
-    if not user_id:
-        return jsonify({'error': 'Missing user_id'}), 400
-
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-
-    img = request.files['image']
-    if img.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-    if not allowed_file(img.filename):
-        return jsonify({'error': 'File type not allowed'}), 400 
+    # The access token identifies the user without a database lookup. Older
+    # clients send a user_id instead, which still has to be checked.
+    user_id = token_user_id()
+    if user_id is None:
+        user_id = request.form.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'Missing user_id'}), 400
+        if not legacy_user_id_allowed():
+            return jsonify({'error': 'Missing access token'}), 401
+
+        user = User.query.get(user_id)
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+    img = request.files.get('image') if not upload_token else None
+    if img is not None:
+        if img.filename == '':
+            return jsonify({'error': 'No selected file'}), 400
+        if not allowed_file(img.filename):
+            return jsonify({'error': 'File type not allowed'}), 400 
         
             
     # Get lat and lon coordinates from the form data
@@ -62,59 +248,116 @@ def report_issue():
     details = request.form.get('details')
     user_defined_issue_type = request.form.get('user_defined_issue_type')
 
-    if not issue_type:
+    # Without an issue_type, the ingest pipeline classifies the image instead.
+    # A staged upload already carries its /classify prediction.
+    auto_classify = request.form.get('auto_classify') == 'true' or bool(upload_token)
+    if not issue_type and not auto_classify:
         return jsonify({'error': 'Missing issue_type'}), 400
     
     # Conditional validation for 'other' issue type
     if issue_type == "other" and not user_defined_issue_type:
         return jsonify({'error': 'User-defined issue type is required when issue type is "other"'}), 400
 
-    # Generate a highly unique filename to prevent frontend caching issues
-    # where an old image might be shown for a new report.
-    ext = os.path.splitext(img.filename)[1]
-    timestamp_str = datetime.now().strftime("%Y%m%d%H%M%S")
-    unique_hash = uuid.uuid4().hex[:8]
-    filename = f"{user_id}_{timestamp_str}_{unique_hash}{ext}"
-    filepath = os.path.join('uploads', filename)
-
-    # --- Thumbnail Generation ---
-    thumbnail_filename = f"thumb_{filename}"
-    thumbnail_filepath = os.path.join('uploads', thumbnail_filename)
-    with PILImage.open(img) as img_pil:
-        # Create a thumbnail with a max dimension of 400px, preserving aspect ratio
-        img_pil.thumbnail((400, 400))
-        img_pil.save(thumbnail_filepath, "JPEG", quality=85)
-    # --- End Thumbnail Generation ---
-
-    # IMPORTANT: Reset the file stream's pointer to the beginning before saving the original.
-    # Reading the stream for thumbnail generation moves the pointer to the end.
-    img.seek(0)
-    # Save image to uploads folder
-    img.save(filepath)
-
-    # Retrieve address of issue from coordinates
-    address = reverse_geocode(lat,lon)
-
-    # Save to DB
+    # Read the upload once; the stored original and the decoded image are
+    # shared with the ingest pipeline.
+    if upload_token:
+        try:
+            upload, predicted_issue_type = load_staged_upload(upload_token)
+        except InvalidUploadToken as e:
+            return jsonify({'error': str(e)}), 400
+        # Use the prediction /classify already made rather than running the model again.
+        if not issue_type and predicted_issue_type:
+            issue_type = predicted_issue_type
+    else:
+        try:
+            upload = ProcessedUpload(img)
+        except UploadTooLarge as e:
+            return jsonify({'error': str(e)}), 413
+
+    # Open reports of the same issue right next to this one, so the client can
+    # offer to follow an existing report instead. Checked before the insert, so
+    # the new report doesn't match itself. Skipped while the type is unknown
+    # (left to the classifier, or 'other'), since any type would match.
+    possible_duplicates = []
+    if issue_type and issue_type != 'other':
+        possible_duplicates = nearest_reports(
+            nearby_sources(status='open', issue_type=issue_type),
+            float(lat), float(lon), radius_m=DUPLICATE_RADIUS_M, k=DUPLICATE_LIMIT,
+        )
+
+    # Store the original under its content hash, so identical uploads share one file.
+    filename = store_upload(upload)
+
+    # Save to DB as pending. Thumbnailing, geocoding and classification run in
+    # the ingest pipeline, which marks the report ready when it is done.
     report = Report(
         user_id=user_id,
         image_filename=filename,
-        thumbnail_filename=thumbnail_filename,
-        issue_type=issue_type,
+        image_hash=upload.content_hash,
+        issue_type=issue_type or UNCLASSIFIED,
         user_defined_issue_type=user_defined_issue_type, # New field
         details=details, # New field
-        address=address,
         latitude=float(lat),
-        longitude=float(lon)
+        longitude=float(lon),
+        processing_status='pending'
     )
     db.session.add(report)
-    db.session.commit()
+    invalidate_reports('user', [(report.latitude, report.longitude)])
+    with stage('commit'):
+        db.session.commit()
+
+    ingest_pipeline.submit(current_app._get_current_object(), report.id, upload)
+
+    response = report.to_dict()
+    response['possible_duplicates'] = possible_duplicates
+    return jsonify(response), 202
 
-    return jsonify(report.to_dict()), 201
+def _send_upload(filename):
+    """
+    Serves a file from uploads/ with long-lived immutable caching.
+
+    Upload filenames are unique per content (content hashes, or timestamp+uuid
+    for older uploads), so the filename is a strong ETag and the file can be
+    cached forever. send_from_directory answers conditional GETs with 304 and
+    byte ranges with 206. With UPLOADS_ACCEL_REDIRECT_PREFIX set, the file is
+    handed off to the front proxy (nginx) instead; USE_X_SENDFILE does the
+    same for Apache/lighttpd.
+    """
+    accel_prefix = current_app.config.get('UPLOADS_ACCEL_REDIRECT_PREFIX')
+    if accel_prefix:
+        if not os.path.isfile(os.path.join('uploads', filename)):
+            abort(404)
+        response = current_app.response_class(mimetype=mimetypes.guess_type(filename)[0])
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{filename}"
+        response.set_etag(filename)
+    else:
+        response = send_from_directory('uploads', filename, etag=filename, max_age=UPLOAD_MAX_AGE)
+
+    response.cache_control.public = True
+    response.cache_control.max_age = UPLOAD_MAX_AGE
+    response.cache_control.immutable = True
+    return response
 
 @report_bp.route('/uploads/<filename>')
 def uploaded_file(filename):
-    return send_from_directory('uploads', filename)
+    return _send_upload(filename)
+
+@report_bp.route('/images/<image_hash>')
+def image_variant(image_hash):
+    """
+    Serves the smallest stored derivative at least `w` pixels wide, as WebP
+    when the client accepts it (or asks for it with `format`), JPEG otherwise.
+    """
+    width = request.args.get('w', THUMBNAIL_SIZE, type=int)
+    fmt = request.args.get('format')
+    webp = fmt == 'webp' if fmt else 'image/webp' in request.accept_mimetypes
+    response = _send_upload(select_derivative(image_hash, width, webp))
+    response.vary.add('Accept')
+    return response
+
+@report_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(viewport_cache.stats())
 
 @report_bp.route('/report/<int:report_id>', methods=['GET'])
 def get_report(report_id):
@@ -130,37 +373,24 @@ def search_reports():
     if not query_str or len(query_str) < 3:
         return jsonify([]) # Return empty for short queries instead of an error
 
-    search_term = f"%{query_str}%"
+    # Matching, newest-first merging and the top-50 limit all happen in the FTS query.
+    matches = full_text_search(query_str, limit=50)
 
-    # Search user-submitted reports (issue type, user-defined type, and details)
-    user_reports_query = Report.query.filter(
-        db.or_(
-            Report.issue_type.ilike(search_term),
-            Report.user_defined_issue_type.ilike(search_term),
-            Report.details.ilike(search_term)
-        )
-    )
-
-    # Search scraped reports (issue type and details)
-    scraped_reports_query = ScrapedReport.query.filter(
-        db.or_(
-            ScrapedReport.issue_type.ilike(search_term),
-            ScrapedReport.details.ilike(search_term)
-        )
-    )
+    reports = {}
+    for report_type, model in (('user', Report), ('scraped', ScrapedReport)):
+        ids = [report_id for match_type, report_id in matches if match_type == report_type]
+        if ids:
+            reports.update({(report_type, r.id): r for r in model.query.filter(model.id.in_(ids))})
 
-    # Combine and format results, adding a 'type' field for the frontend
-    user_results = [r.to_dict() for r in user_reports_query.all()]
-    for r in user_results:
-        r['type'] = 'user'
+    # Format results in query order, adding a 'type' field for the frontend
+    results = []
+    for key in matches:
+        if key in reports:
+            report_dict = reports[key].to_dict()
+            report_dict['type'] = key[0]
+            results.append(report_dict)
 
-    scraped_results = [r.to_dict() for r in scraped_reports_query.all()]
-    for r in scraped_results:
-        r['type'] = 'scraped'
-
-    all_results = sorted(user_results + scraped_results, key=lambda r: r.get('timestamp') or r.get('date_created'), reverse=True)
-
-    return jsonify(all_results[:50]) # Limit to the top 50 results
+    return jsonify(results)
 
 @report_bp.route('/scraped-reports/<int:report_id>', methods=['GET'])
 def get_scraped_report(report_id):
@@ -179,35 +409,33 @@ def get_all_reports():
     ne_lng = request.args.get('ne_lng', type=float)
     status = request.args.get('status')
 
-    query = Report.query
-
-    if all([sw_lat, sw_lng, ne_lat, ne_lng]):
-        query = query.filter(Report.latitude.between(sw_lat, ne_lat), Report.longitude.between(sw_lng, ne_lng))
-
-    if status == 'open':
-        # "submitted" and "in progress" are considered open.
-        query = query.filter(Report.status.in_(['submitted', 'in progress']))
-    elif status == 'closed':
-        query = query.filter(Report.status == 'closed')
-
-    # Add a limit for safety and consistency
-    reports = query.order_by(Report.timestamp.desc()).limit(500).all()
-    return jsonify([r.to_dict() for r in reports])
+    bbox = (sw_lat, sw_lng, ne_lat, ne_lng) if all([sw_lat, sw_lng, ne_lat, ne_lng]) else None
+    return _viewport_response('user', Report, Report.timestamp, bbox, report_status_filters(status))
 
 @report_bp.route('/my-reports/<int:user_id>', methods=['GET'])
 def get_my_reports(user_id):
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-        
-    reports = Report.query.filter_by(user_id=user_id).order_by(Report.timestamp.desc()).all()
-    return jsonify([r.to_dict() for r in reports])
+    token_user = token_user_id()
+    if token_user is not None:
+        if token_user != user_id:
+            return jsonify({'error': 'Unauthorized'}), 403
+    elif not legacy_user_id_allowed():
+        return jsonify({'error': 'Missing access token'}), 401
+    else:
+        user = User.query.get(user_id)
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+    return _paginated_response(Report.query.filter_by(user_id=user_id), Report, Report.timestamp, Report.id)
 
 @report_bp.route('/report/<int:report_id>', methods=['DELETE'])
 def delete_report(report_id):
-    user_id = request.json.get('user_id')
-    if not user_id:
-        return jsonify({'error': 'Missing user_id for authorization'}), 400
+    user_id = token_user_id()
+    if user_id is None:
+        user_id = (request.get_json(silent=True) or {}).get('user_id')
+        if not user_id:
+            return jsonify({'error': 'Missing user_id for authorization'}), 400
+        if not legacy_user_id_allowed():
+            return jsonify({'error': 'Missing access token'}), 401
 
     report = Report.query.get(report_id)
     if not report:
@@ -216,13 +444,21 @@ def delete_report(report_id):
     if report.user_id != int(user_id):
         return jsonify({'error': 'Unauthorized'}), 403
 
-    try:
-        os.remove(os.path.join('uploads', report.image_filename))
-    except OSError as e:
-        print(f"Error deleting file {report.image_filename}: {e}")
-
     db.session.delete(report)
+    invalidate_reports('user', [(report.latitude, report.longitude)])
     db.session.commit()
+
+    if report.image_hash:
+        # Other reports may have been submitted with the same image.
+        release_image(report.image_hash, Report.query.filter_by(image_hash=report.image_hash).count())
+    else:
+        for filename in (report.image_filename, report.thumbnail_filename):
+            if not filename:
+                continue
+            try:
+                os.remove(os.path.join('uploads', filename))
+            except OSError as e:
+                print(f"Error deleting file {filename}: {e}")
     
     return jsonify({'message': 'Report deleted successfully'}), 200
 
@@ -230,8 +466,8 @@ def delete_report(report_id):
 def get_all_scraped_reports():
     """
     Fetches scraped reports. If map bounding box coordinates are provided as query
-    parameters, it filters reports within that box. Otherwise, it returns the
-    latest 500 reports.
+    parameters, it filters reports within that box. Results are paginated,
+    newest first, 500 per page by default (see _paginated_response).
     """
     sw_lat = request.args.get('sw_lat', type=float)
     sw_lng = request.args.get('sw_lng', type=float)
@@ -239,21 +475,168 @@ def get_all_scraped_reports():
     ne_lng = request.args.get('ne_lng', type=float)
     status = request.args.get('status')
 
-    query = ScrapedReport.query
+    bbox = (sw_lat, sw_lng, ne_lat, ne_lng) if all([sw_lat, sw_lng, ne_lat, ne_lng]) else None
+    return _viewport_response('scraped', ScrapedReport, ScrapedReport.date_created, bbox, scraped_status_filters(status))
 
-    # Always filter out reports where the status is 'NotAnIssue'.
-    query = query.filter(db.not_(ScrapedReport.status.ilike('NotAnIssue')))
-    query = query.filter(db.not_(ScrapedReport.status.ilike('Cancelled')))
+@report_bp.route('/reports/clusters', methods=['GET'])
+def get_report_clusters():
+    """
+    Aggregates user and scraped reports inside the map bounding box into grid
+    cells sized for the given zoom level. Dense cells come back as clusters with
+    per-issue_type counts; sparse cells come back as individual reports.
+    """
+    zoom = request.args.get('zoom', type=int)
+    status = request.args.get('status')
+    try:
+        sw_lat, sw_lng, ne_lat, ne_lng = _parse_bbox_args(required=True)
+        source = _parse_source()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if zoom is None or not 0 <= zoom <= 22:
+        return jsonify({'error': 'zoom must be an integer between 0 and 22'}), 400
+    if bbox_cell_count(sw_lat, sw_lng, ne_lat, ne_lng, zoom) > MAX_CELLS:
+        return jsonify({'error': 'Bounding box is too large for this zoom level'}), 400
+
+    sources = []
+    if source in ('all', 'user'):
+        filters = [*bbox_filter(Report, sw_lat, sw_lng, ne_lat, ne_lng), *report_status_filters(status)]
+        sources.append(('user', Report, filters, Report.timestamp.desc()))
+    if source in ('all', 'scraped'):
+        filters = [*bbox_filter(ScrapedReport, sw_lat, sw_lng, ne_lat, ne_lng), *scraped_status_filters(status)]
+        sources.append(('scraped', ScrapedReport, filters, ScrapedReport.date_created.desc()))
+
+    return jsonify(cluster_reports(sources, zoom))
+
+@report_bp.route('/reports/nearby', methods=['GET'])
+def get_nearby_reports():
+    """
+    User and scraped reports closest to `lat`/`lon`, nearest first, each with
+    its `distance_m`. With `radius` (meters), returns the reports inside it
+    (at most `k`, default 100); otherwise the `k` nearest (default 10). Also serves as the
+    pre-submit duplicate check: radius=50&status=open&issue_type=<type>.
+    """
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    radius = request.args.get('radius', type=float)
+    k = request.args.get('k', type=int)
+
+    if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({'error': 'Missing or invalid lat/lon'}), 400
+    if radius is not None and not 0 < radius <= MAX_RADIUS_M:
+        return jsonify({'error': f'radius must be between 0 and {MAX_RADIUS_M:.0f} meters'}), 400
+    if k is not None and not 1 <= k <= MAX_NEARBY_RESULTS:
+        return jsonify({'error': f'k must be between 1 and {MAX_NEARBY_RESULTS}'}), 400
+    try:
+        source = _parse_source()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if k is None:
+        k = 10 if radius is None else MAX_NEARBY_RESULTS
+
+    sources = nearby_sources(source, request.args.get('status'), request.args.get('issue_type'))
+    return jsonify(nearest_reports(sources, lat, lon, radius_m=radius, k=k))
 
-    if all([sw_lat, sw_lng, ne_lat, ne_lng]):
-        query = query.filter(ScrapedReport.latitude.between(sw_lat, ne_lat), ScrapedReport.longitude.between(sw_lng, ne_lng))
+@report_bp.route('/reports/live', methods=['GET'])
+def live_reports():
+    """
+    Pushes report inserts, updates and deletes as Server-Sent Events, so map
+    and feed screens can apply deltas instead of re-fetching their lists.
+    Takes the source, bbox and status filters of the list endpoints. On a
+    `reset` event (the client fell behind, or a bulk import) or after a
+    reconnect, the client should refetch its list.
+    """
+    status = request.args.get('status')
+    if status not in (None, 'open', 'closed'):
+        return jsonify({'error': 'status must be open or closed'}), 400
+    try:
+        source = _parse_source()
+        bbox = _parse_bbox_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    sources = ('user', 'scraped') if source == 'all' else (source,)
+    try:
+        subscription = live_events.subscribe(current_app._get_current_object(), sources, bbox, status)
+    except TooManySubscribers as e:
+        return jsonify({'error': str(e)}), 503
+    return current_app.response_class(
+        event_stream(live_events, subscription),
+        mimetype='text/event-stream',
+        # Keep proxies (nginx) from buffering the stream
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
 
-    if status == 'open':
-        # Use `not ilike` to find statuses that do not contain 'close' case-insensitively.
-        query = query.filter(db.not_(ScrapedReport.status.ilike('%close%')))
-    elif status == 'closed':
-        # Use `ilike` for case-insensitive matching for 'closed'.
-        query = query.filter(ScrapedReport.status.ilike('%close%'))
+@report_bp.route('/reports/rollups', methods=['GET'])
+def get_report_rollups():
+    """
+    Report counts per time bucket (`interval`: day, week, month or total),
+    optionally split by `group_by` (comma-separated: cell, issue_type, status,
+    source), for heatmaps and trends. Served from the issue_rollup table, so
+    the cost doesn't grow with the number of reports.
+    """
+    interval = request.args.get('interval', 'week')
+    group_by = [field for field in request.args.get('group_by', '').split(',') if field]
+    status = request.args.get('status', 'all')
+
+    if interval not in INTERVALS:
+        return jsonify({'error': f"interval must be one of {', '.join(INTERVALS)}"}), 400
+    if any(field not in GROUP_BY_FIELDS for field in group_by):
+        return jsonify({'error': f"group_by fields must be among {', '.join(GROUP_BY_FIELDS)}"}), 400
+    if status not in ('all', 'open', 'closed'):
+        return jsonify({'error': 'status must be one of all, open, closed'}), 400
+    try:
+        source = _parse_source()
+        date_from, date_to = _parse_date_args()
+        bbox = _parse_bbox_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    counts = issue_counts(
+        interval=interval,
+        group_by=group_by,
+        date_from=date_from,
+        date_to=date_to,
+        bbox=bbox,
+        sources=None if source == 'all' else [source],
+        issue_type=request.args.get('issue_type'),
+        statuses=('open', 'closed') if status == 'all' else (status,),
+    )
+    return jsonify({'interval': interval, 'cell_size': ROLLUP_CELL_SIZE, 'counts': counts})
 
-    reports = query.order_by(ScrapedReport.date_created.desc()).limit(500).all()
-    return jsonify([r.to_dict() for r in reports])
+@report_bp.route('/reports/export', methods=['GET'])
+def export_reports_endpoint():
+    """
+    Streams every matching report as `format` (ndjson, csv or geojson),
+    optionally gzipped (compress=gzip). Takes the same source, bbox, status,
+    issue_type and date_from/date_to filters as /reports/rollups, with no
+    page size limit. See `flask export-reports` for the CLI equivalent.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    status = request.args.get('status', 'all')
+    compress = request.args.get('compress')
+
+    if fmt not in FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(FORMATS)}"}), 400
+    if status not in ('all', 'open', 'closed'):
+        return jsonify({'error': 'status must be one of all, open, closed'}), 400
+    if compress not in (None, 'gzip'):
+        return jsonify({'error': 'compress must be gzip'}), 400
+    try:
+        source = _parse_source()
+        date_from, date_to = _parse_date_args()
+        bbox = _parse_bbox_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    sources = export_sources(source, date_from, date_to, bbox, status, request.args.get('issue_type'))
+    chunks = export_reports(sources, fmt)
+    filename = f"reports.{fmt}"
+    if compress:
+        chunks = gzip_chunks(chunks)
+        filename += '.gz'
+    response = current_app.response_class(
+        stream_with_context(chunks),
+        mimetype='application/gzip' if compress else FORMATS[fmt],
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
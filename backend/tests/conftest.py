@@ -0,0 +1,13 @@
+import pytest
+from flask import Flask
+
+from database import init_db
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """An app with a fresh database, inside an app context."""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'app.db'}")
+    app = Flask(__name__)
+    init_db(app)
+    with app.app_context():
+        yield app
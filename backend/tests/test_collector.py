@@ -0,0 +1,101 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from collector.citysourced import CitySourcedAdapter
+from collector.fake_server import fake_city_reports, serve_fake_city_api
+from collector.runner import collect, _date_windows
+from database import db
+from database.models import CollectorState, ScrapedReport
+
+REPORT_COUNT = 120
+
+@pytest.fixture
+def fake_api():
+    """Starts a fake city API; call it with the serve_fake_city_api options."""
+    servers = []
+
+    def start(**kwargs):
+        reports = list(fake_city_reports(REPORT_COUNT, random.Random(1), days=200))
+        server = serve_fake_city_api(reports, **kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+def _adapter(server, **attributes):
+    adapter = CitySourcedAdapter(
+        'FakeCity', base_url=f"http://127.0.0.1:{server.port}", location=(-82.325002, 29.651964), page_size=10,
+    )
+    for name, value in attributes.items():
+        setattr(adapter, name, value)
+    return adapter
+
+def _stats(server):
+    return server.app.config['stats']
+
+def test_collects_every_page_of_every_window(app, fake_api):
+    server = fake_api()
+    adapter = _adapter(server, window_days=30)
+    summary = collect(adapter)
+
+    assert summary['fetched'] == REPORT_COUNT
+    assert summary['counts']['inserted'] == REPORT_COUNT
+    assert db.session.scalar(db.select(db.func.count(ScrapedReport.id))) == REPORT_COUNT
+    # Windows with more than 10 reports took several pages.
+    now = datetime.now()
+    assert _stats(server)['requests'] > len(_date_windows(adapter.initial_date_from(now), now, 30))
+
+def test_retries_unavailable_responses(app, fake_api):
+    server = fake_api(failure_rate=0.3, seed=2)
+    summary = collect(_adapter(server, fetch_workers=1))
+
+    assert _stats(server)['failed'] > 0
+    assert summary['counts']['inserted'] == REPORT_COUNT
+
+def test_refreshes_an_expired_token(app, fake_api):
+    server = fake_api(token_ttl=0.5)
+    adapter = _adapter(server, fetch_workers=1)
+    collect(adapter)
+    time.sleep(0.6)
+    collect(adapter, full=True)
+
+    stats = _stats(server)
+    assert stats['rejected'] == 1
+    assert stats['sessions'] == 2
+
+def test_incremental_run_ingests_nothing_new(app, fake_api):
+    server = fake_api()
+    adapter = _adapter(server)
+    collect(adapter)
+    requests_before = _stats(server)['requests']
+
+    summary = collect(adapter)
+
+    assert summary['counts']['inserted'] == 0
+    assert summary['counts']['updated'] == 0
+    assert summary['fetched'] < REPORT_COUNT
+    # Only the overlap since the high-water mark is fetched: one window, one page.
+    assert _stats(server)['requests'] - requests_before == 1
+
+def test_resync_reaches_back_no_further_than_resync_max_age(app, fake_api, capsys):
+    server = fake_api()
+    adapter = _adapter(server)
+    collect(adapter)
+    state = db.session.get(CollectorState, adapter.name)
+    state.last_resync_at -= timedelta(days=2)
+    db.session.commit()
+    fetched_windows = []
+    fetch_window = adapter.fetch_window
+    adapter.fetch_window = lambda date_from, date_to: fetched_windows.append(date_from) or fetch_window(date_from, date_to)
+
+    started = datetime.now()
+    collect(adapter)
+
+    # The fake reports span 200 days, so some open ones are older than 90 days.
+    assert min(fetched_windows) >= started - adapter.resync_max_age - timedelta(seconds=5)
+    assert "too old to re-sync" in capsys.readouterr().out
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from collector.citysourced import CitySourcedAdapter
+from collector.ingest import ingest_scraped_reports
+from database import db
+from database.models import ScrapedReport
+
+def _raw_reports(first_id, count, city):
+    return [{
+        'Id': source_id,
+        'RequestType': 'Pothole',
+        'DateCreated': datetime(2026, 1, 1, 12).isoformat(),
+        'FormattedAddress': f"{source_id} Main St",
+        'Description': f"{city} {source_id}",
+        'Latitude': 29.65,
+        'Longitude': -82.32,
+        'StatusType': 'Open' if city == 'CITY A' else 'Closed',
+    } for source_id in range(first_id, first_id + count)]
+
+def test_sources_with_overlapping_ids_are_kept_apart(app):
+    city_a = CitySourcedAdapter('CityA', base_url='https://a.invalid', location=(-82.32, 29.65), radius=1000)
+    city_b = CitySourcedAdapter('CityB', base_url='https://b.invalid', location=(-82.32, 29.65), radius=1000)
+
+    assert ingest_scraped_reports(_raw_reports(1, 50, 'CITY A'), city_a)['inserted'] == 50
+    counts = ingest_scraped_reports(_raw_reports(10, 50, 'CITY B'), city_b)
+    db.session.commit()
+
+    assert counts['inserted'] == 50
+    assert counts['updated'] == 0
+    city_a_rows = db.session.execute(
+        db.select(ScrapedReport.details, ScrapedReport.status).where(ScrapedReport.source == 'CityA')
+    ).all()
+    assert len(city_a_rows) == 50
+    assert all(details.startswith('CITY A') and status == 'Open' for details, status in city_a_rows)
+
+    # Re-ingesting a source still matches its own rows.
+    counts = ingest_scraped_reports(_raw_reports(10, 50, 'CITY B'), city_b)
+    assert counts == {'inserted': 0, 'updated': 0, 'unchanged': 50, 'skipped': 0}
@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from database import db
+from database.models import Report, User
+from utils.pagination import paginate, decode_cursor, encode_cursor
+
+def test_cursor_round_trips_a_null_sort_value():
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+    assert decode_cursor(encode_cursor(datetime(2026, 1, 1, 12), 7)) == (datetime(2026, 1, 1, 12), 7)
+
+def test_pages_continue_past_rows_without_a_timestamp(app):
+    user = User(username='u', email='u@example.invalid', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    db.session.execute(db.insert(Report), [{
+        'user_id': user.id, 'image_filename': f"{i}.jpg", 'issue_type': 'pothole',
+        'latitude': 29.65, 'longitude': -82.32,
+        'timestamp': datetime(2026, 1, i + 1) if i < 3 else None,
+    } for i in range(6)])
+    # The insert default fills in missing timestamps; old rows have none.
+    db.session.execute(db.update(Report).where(Report.image_filename.in_(['3.jpg', '4.jpg', '5.jpg'])).values(timestamp=None))
+    db.session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        rows, cursor = paginate(Report.query, Report.timestamp, Report.id, cursor=cursor, limit=2)
+        seen.extend(row.image_filename for row in rows)
+        if cursor is None:
+            break
+    assert seen == ['2.jpg', '1.jpg', '0.jpg', '5.jpg', '4.jpg', '3.jpg']
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+import pytest
+
+from database import db
+from database.models import ScrapedReport
+from routes.report_routes import report_bp
+from utils.viewport_cache import viewport_cache
+
+@pytest.fixture
+def client(app):
+    app.register_blueprint(report_bp)
+    viewport_cache.invalidate('scraped')
+    # All three points are in the same 0.01 degree tile.
+    db.session.execute(db.insert(ScrapedReport), [{
+        'source': 'Gainesville_311', 'source_id': source_id, 'issue_type': 'Pothole',
+        'date_created': datetime(2026, 1, source_id), 'latitude': lat, 'longitude': lng,
+        'status': 'Open', 'status_normalized': 'open',
+    } for source_id, lat, lng in ((1, 29.651, -82.329), (2, 29.652, -82.328), (3, 29.658, -82.322))])
+    db.session.commit()
+    return app.test_client()
+
+def _viewport(client, sw_lat, sw_lng, ne_lat, ne_lng, **params):
+    return client.get('/scraped-reports', query_string={
+        'sw_lat': sw_lat, 'sw_lng': sw_lng, 'ne_lat': ne_lat, 'ne_lng': ne_lng, **params,
+    })
+
+def test_nearby_viewports_share_an_entry_but_get_their_own_reports(client):
+    first = _viewport(client, 29.6505, -82.3295, 29.6515, -82.3285)
+    second = _viewport(client, 29.6515, -82.3285, 29.6525, -82.3275)
+
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert [r['source_id'] for r in first.get_json()] == [1]
+    assert [r['source_id'] for r in second.get_json()] == [2]
+
+def test_cached_viewport_pages_with_a_cursor(client):
+    first = _viewport(client, 29.650, -82.330, 29.659, -82.321, limit=2)
+    assert [r['source_id'] for r in first.get_json()] == [3, 2]
+
+    second = _viewport(client, 29.650, -82.330, 29.659, -82.321, limit=2, cursor=first.headers['X-Next-Cursor'])
+    assert second.headers['X-Cache'] == 'HIT'
+    assert [r['source_id'] for r in second.get_json()] == [1]
+    assert 'X-Next-Cursor' not in second.headers
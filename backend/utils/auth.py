@@ -0,0 +1,17 @@
+from flask import current_app
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+
+def token_user_id():
+    """
+    Returns the user id carried by the request's access token (the
+    Authorization: Bearer header), or None without one. The token's signature
+    and expiry are checked without touching the database; an invalid or
+    expired token is rejected with 401/422 by flask-jwt-extended.
+    """
+    verify_jwt_in_request(optional=True)
+    identity = get_jwt_identity()
+    return int(identity) if identity is not None else None
+
+def legacy_user_id_allowed():
+    """Whether requests may still identify the user with a plain user_id instead of a token."""
+    return current_app.config.get('LEGACY_USER_ID_AUTH', False)
@@ -0,0 +1,120 @@
+import math
+from database import db
+from database.models import media_base_url
+
+# A 256px map tile is split into CELLS_PER_TILE x CELLS_PER_TILE grid cells,
+# so a cell covers roughly 64px on screen at the requested zoom level.
+CELLS_PER_TILE = 4
+# Cells with at most this many reports are returned as individual reports.
+SPARSE_CELL_THRESHOLD = 3
+# A bbox may span at most this many cells (32 tiles, about a 4K screen), so
+# zooming in can't turn a wide bbox into a request for every report in it.
+# Sparse cells return at most MAX_SPARSE_REPORTS reports.
+MAX_CELLS = 2048
+MAX_SPARSE_REPORTS = 500
+
+def cell_size_for_zoom(zoom):
+    """Returns the edge length, in degrees, of a grid cell at the given zoom."""
+    return 360.0 / (2 ** zoom) / CELLS_PER_TILE
+
+def bbox_cell_count(sw_lat, sw_lng, ne_lat, ne_lng, zoom):
+    """Returns how many grid cells the bounding box spans at the given zoom."""
+    cell_size = cell_size_for_zoom(zoom)
+    rows = math.floor((ne_lat + 90.0) / cell_size) - math.floor((sw_lat + 90.0) / cell_size) + 1
+    cols = math.floor((ne_lng + 180.0) / cell_size) - math.floor((sw_lng + 180.0) / cell_size) + 1
+    return max(rows, 0) * max(cols, 0)
+
+def _cell_columns(model, cell_size):
+    # Coordinates are shifted to be non-negative so integer truncation matches floor().
+    row = db.cast((model.latitude + 90.0) / cell_size, db.Integer)
+    col = db.cast((model.longitude + 180.0) / cell_size, db.Integer)
+    return row, col
+
+def _aggregate(model, filters, cell_size):
+    row, col = _cell_columns(model, cell_size)
+    stmt = (
+        db.select(
+            row.label('row'),
+            col.label('col'),
+            model.issue_type,
+            db.func.count().label('count'),
+            db.func.sum(model.latitude).label('lat_sum'),
+            db.func.sum(model.longitude).label('lng_sum'),
+        )
+        .where(*filters)
+        .group_by(row, col, model.issue_type)
+    )
+    return db.session.execute(stmt).all()
+
+def _reports_in_cells(model, filters, cell_size, cells, order_by, limit):
+    row, col = _cell_columns(model, cell_size)
+    return (
+        model.query
+        .with_entities(*model.serialized_columns())
+        .filter(*filters)
+        .filter(db.tuple_(row, col).in_(cells))
+        .order_by(order_by)
+        .limit(limit)
+        .all()
+    )
+
+def cluster_reports(sources, zoom, sparse_threshold=SPARSE_CELL_THRESHOLD, max_reports=MAX_SPARSE_REPORTS):
+    """
+    Groups reports from one or more sources into grid cells for the given zoom.
+
+    `sources` is a list of (type, model, filters, order_by) tuples. Counts from all
+    sources are merged per cell; each dense cell is returned as a cluster with a
+    centroid and a per-issue_type breakdown, while sparse cells fall back to
+    their individual reports (tagged with `type` like the search endpoint).
+    At most `max_reports` reports are returned; `reports_truncated` says
+    whether any were left out.
+    """
+    cell_size = cell_size_for_zoom(zoom)
+    cells = {}
+
+    for _, model, filters, _ in sources:
+        for row, col, issue_type, count, lat_sum, lng_sum in _aggregate(model, filters, cell_size):
+            cell = cells.setdefault((row, col), {'count': 0, 'lat_sum': 0.0, 'lng_sum': 0.0, 'issue_types': {}})
+            cell['count'] += count
+            cell['lat_sum'] += lat_sum
+            cell['lng_sum'] += lng_sum
+            cell['issue_types'][issue_type] = cell['issue_types'].get(issue_type, 0) + count
+
+    clusters = []
+    sparse_cells = []
+    for (row, col), cell in cells.items():
+        if cell['count'] <= sparse_threshold:
+            sparse_cells.append((row, col))
+            continue
+        clusters.append({
+            'cell': f"{zoom}/{row}/{col}",
+            'count': cell['count'],
+            'latitude': cell['lat_sum'] / cell['count'],
+            'longitude': cell['lng_sum'] / cell['count'],
+            'issue_types': cell['issue_types'],
+        })
+
+    reports = []
+    truncated = False
+    if sparse_cells:
+        base_url = media_base_url()
+        for report_type, model, filters, order_by in sources:
+            remaining = max_reports - len(reports)
+            # One extra row tells whether the cap cut anything off.
+            rows = _reports_in_cells(model, filters, cell_size, sparse_cells, order_by, remaining + 1)
+            if len(rows) > remaining:
+                truncated = True
+                rows = rows[:remaining]
+            for row in rows:
+                report_dict = model.serialize(row, base_url)
+                report_dict['type'] = report_type
+                reports.append(report_dict)
+
+    clusters.sort(key=lambda c: c['count'], reverse=True)
+    return {
+        'zoom': zoom,
+        'cell_size': cell_size,
+        'clusters': clusters,
+        'reports': reports,
+        'reports_truncated': truncated,
+    }
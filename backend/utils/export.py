@@ -0,0 +1,169 @@
+import csv
+import io
+import zlib
+from datetime import datetime, time
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from database import db
+from database.models import Report, ScrapedReport, media_base_url
+from database.spatial import bbox_filter
+from database.filters import report_status_filters, scraped_status_filters, issue_type_filter
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'geojson': 'application/geo+json',
+}
+# Rows fetched, and serialized per yielded chunk, at a time
+EXPORT_BATCH_SIZE = 1000
+
+# (type, model, date column, status filters) per exportable source
+SOURCES = [
+    ('user', Report, Report.timestamp, report_status_filters),
+    ('scraped', ScrapedReport, ScrapedReport.date_created, scraped_status_filters),
+]
+
+def export_sources(source='all', date_from=None, date_to=None, bbox=None, status=None, issue_type=None):
+    """Builds the (type, model, filters) sources to export."""
+    sources = []
+    for report_type, model, date_column, status_filters in SOURCES:
+        if source not in ('all', report_type):
+            continue
+        filters = status_filters(status)
+        if date_from:
+            filters.append(date_column >= datetime.combine(date_from, time.min))
+        if date_to:
+            filters.append(date_column <= datetime.combine(date_to, time.max))
+        if bbox is not None:
+            filters.extend(bbox_filter(model, *bbox))
+        if issue_type:
+            filters.append(issue_type_filter(model.issue_type, issue_type))
+        sources.append((report_type, model, filters))
+    return sources
+
+def _rows(sources):
+    """
+    Yields batches of (type, dict) for every matching report, paged by id.
+    Each batch is read in its own short transaction: an open read would hold
+    SQLite's shared lock, and block every writer, for as long as a slow
+    client takes to download the export.
+    """
+    base_url = media_base_url()
+    for report_type, model, filters in sources:
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                db.select(*model.serialized_columns()).where(*filters, model.id > last_id)
+                .order_by(model.id).limit(EXPORT_BATCH_SIZE)
+            ).all()
+            db.session.close()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            yield [(report_type, model.serialize(row, base_url)) for row in rows]
+            if len(rows) < EXPORT_BATCH_SIZE:
+                break
+
+def _ndjson(sources):
+    dumps = current_app.json.dumps
+    for batch in _rows(sources):
+        yield ''.join(dumps({'type': report_type, **report}) + '\n' for report_type, report in batch)
+
+class _NullRow:
+    def __getattr__(self, name):
+        return None
+
+def _csv_fieldnames(sources):
+    """The union of the serialized fields of every source, in order."""
+    fieldnames = ['type']
+    for _, model, _ in sources:
+        fieldnames.extend(f for f in model.serialize(_NullRow(), base_url='') if f not in fieldnames)
+    return fieldnames
+
+def _csv(sources):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=_csv_fieldnames(sources))
+    writer.writeheader()
+    for batch in _rows(sources):
+        writer.writerows({'type': report_type, **report} for report_type, report in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def _geojson(sources):
+    dumps = current_app.json.dumps
+    yield '{"type": "FeatureCollection", "features": ['
+    first = True
+    for batch in _rows(sources):
+        features = []
+        for report_type, report in batch:
+            longitude, latitude = report.pop('longitude'), report.pop('latitude')
+            geometry = {'type': 'Point', 'coordinates': [longitude, latitude]} if latitude is not None and longitude is not None else None
+            features.append(dumps({'type': 'Feature', 'geometry': geometry, 'properties': {'type': report_type, **report}}))
+        if features:
+            yield ('' if first else ',') + ','.join(features)
+            first = False
+    yield ']}\n'
+
+def export_reports(sources, fmt):
+    """
+    Generates the export in `fmt` chunk by chunk. Rows are read
+    EXPORT_BATCH_SIZE at a time, so memory stays constant however many
+    reports are exported.
+    """
+    return {'ndjson': _ndjson, 'csv': _csv, 'geojson': _geojson}[fmt](sources)
+
+def gzip_chunks(chunks):
+    """Gzip-compresses a stream of text chunks without buffering it."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)   # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _parse_bbox(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        bbox = tuple(float(v) for v in value.split(','))
+    except ValueError:
+        bbox = ()
+    if len(bbox) != 4:
+        raise click.BadParameter('expected sw_lat,sw_lng,ne_lat,ne_lng')
+    return bbox
+
+@click.command('export-reports')
+@click.option('--format', 'fmt', type=click.Choice(list(FORMATS)), default='ndjson', show_default=True)
+@click.option('--source', type=click.Choice(['all', 'user', 'scraped']), default='all', show_default=True)
+@click.option('--date-from', type=click.DateTime(['%Y-%m-%d']), help='Created on or after this day.')
+@click.option('--date-to', type=click.DateTime(['%Y-%m-%d']), help='Created on or before this day.')
+@click.option('--bbox', callback=_parse_bbox, help='sw_lat,sw_lng,ne_lat,ne_lng')
+@click.option('--status', type=click.Choice(['all', 'open', 'closed']), default='all', show_default=True)
+@click.option('--issue-type', help='Case-insensitive issue_type.')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('--output', '-o', type=click.Path(dir_okay=False, allow_dash=True), default='-', help='File to write (default: stdout).')
+@with_appcontext
+def export_reports_command(fmt, source, date_from, date_to, bbox, status, issue_type, compress, output):
+    """Streams user and/or scraped reports as NDJSON, CSV or GeoJSON."""
+    sources = export_sources(
+        source,
+        date_from.date() if date_from else None,
+        date_to.date() if date_to else None,
+        bbox, status, issue_type,
+    )
+    chunks = export_reports(sources, fmt)
+    if compress:
+        with click.open_file(output, 'wb') as out:
+            for data in gzip_chunks(chunks):
+                out.write(data)
+    else:
+        with click.open_file(output, 'w', encoding='utf-8', newline='') as out:
+            for chunk in chunks:
+                out.write(chunk)
+
+def register_export(app):
+    app.cli.add_command(export_reports_command)
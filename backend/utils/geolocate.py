@@ -1,19 +1,187 @@
+import csv
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
 import requests
+from requests.adapters import HTTPAdapter
+
+NOMINATIM_URL = 'https://nominatim.openstreetmap.org/reverse'
+USER_AGENT = '311SimplifierApp/0.1 (311-application)'
+
+# Coordinates are rounded to this many decimals before the cache lookup.
+# 4 decimals is about 11m, so reports on the same block share one entry.
+CACHE_PRECISION = int(os.environ.get('GEOCODE_CACHE_PRECISION', 4))
+LRU_SIZE = int(os.environ.get('GEOCODE_LRU_SIZE', 4096))
+CACHE_PATH = os.environ.get(
+    'GEOCODE_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/geocode_cache.db')
+)
+
+class TokenBucket:
+    """Blocking token-bucket rate limiter shared by all threads."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class GeocodeProvider:
+    """Turns coordinates into a display address."""
+
+    def reverse(self, lat, lon):
+        raise NotImplementedError
+
+class NominatimProvider(GeocodeProvider):
+    """
+    Reverse geocodes through OpenStreetMap's Nominatim over a pooled session,
+    rate limited to Nominatim's usage policy of one request per second.
+    """
+
+    def __init__(self, url=NOMINATIM_URL, timeout=(3.05, 10), requests_per_second=1.0):
+        self.url = url
+        self.timeout = timeout
+        self.limiter = TokenBucket(requests_per_second)
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=8))
+
+    def reverse(self, lat, lon):
+        self.limiter.acquire()
+        response = self.session.get(
+            self.url,
+            params={'lat': lat, 'lon': lon, 'format': 'json'},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+        data = response.json()
+        return data.get('display_name', 'Address not found')
+
+class StaticProvider(GeocodeProvider):
+    """Returns a fixed address (or the result of a callable); used for tests and benchmarks."""
+
+    def __init__(self, address='Address not found'):
+        self.address = address
+
+    def reverse(self, lat, lon):
+        return self.address(lat, lon) if callable(self.address) else self.address
+
+class GazetteerProvider(GeocodeProvider):
+    """
+    Offline provider returning the nearest entry of a CSV gazetteer with
+    `latitude`, `longitude` and `name` columns.
+    """
+
+    def __init__(self, path):
+        with open(path, newline='') as f:
+            self.places = [(float(row['latitude']), float(row['longitude']), row['name']) for row in csv.DictReader(f)]
+
+    def reverse(self, lat, lon):
+        if not self.places:
+            return 'Address not found'
+        cos_lat = math.cos(math.radians(lat))
+        nearest = min(self.places, key=lambda p: (p[0] - lat) ** 2 + ((p[1] - lon) * cos_lat) ** 2)
+        return nearest[2]
+
+class GeocodeCache:
+    """In-process LRU in front of a persistent SQLite cache, keyed on quantized coordinates."""
+
+    def __init__(self, path=CACHE_PATH, lru_size=LRU_SIZE, precision=CACHE_PRECISION):
+        self.precision = precision
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS geocode_cache ("
+            "key TEXT PRIMARY KEY, address TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def key(self, lat, lon):
+        return f"{round(float(lat), self.precision)},{round(float(lon), self.precision)}"
+
+    def get(self, key):
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return self._lru[key]
+            row = self._db.execute("SELECT address FROM geocode_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, row[0])
+            return row[0]
+
+    def set(self, key, address):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO geocode_cache (key, address, created_at) VALUES (?, ?, ?)",
+                (key, address, time.time())
+            )
+            self._db.commit()
+            self._remember(key, address)
+
+    def _remember(self, key, address):
+        self._lru[key] = address
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+_provider = None
+_cache = None
+
+def _default_provider():
+    name = os.environ.get('GEOCODE_PROVIDER', 'nominatim')
+    if name == 'static':
+        return StaticProvider(os.environ.get('GEOCODE_STATIC_ADDRESS', 'Address not found'))
+    if name == 'gazetteer':
+        return GazetteerProvider(os.environ['GEOCODE_GAZETTEER_PATH'])
+    return NominatimProvider()
+
+def set_provider(provider):
+    """Replaces the geocoding provider, e.g. with a StaticProvider in tests."""
+    global _provider
+    _provider = provider
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = GeocodeCache()
+    return _cache
 
 def reverse_geocode(lat, lon):
-    url = 'https://nominatim.openstreetmap.org/reverse'
-    params = {
-        'lat': lat,
-        'lon': lon,
-        'format': 'json'
-    }
-    headers = {
-        'User-Agent': '311SimplifierApp/0.1 (311-application)'
-    }
-
-    response = requests.get(url, params=params, headers=headers)
-    print(f"Request URL: {response.url}")  # Debugging line to check the request URL
-    response.raise_for_status()  
-
-    data = response.json()
-    return data.get('display_name', 'Address not found')
\ No newline at end of file
+    global _provider
+    if _provider is None:
+        _provider = _default_provider()
+
+    cache = get_cache()
+    key = cache.key(lat, lon)
+    address = cache.get(key)
+    if address is None:
+        address = _provider.reverse(lat, lon)
+        cache.set(key, address)
+    return address
@@ -0,0 +1,67 @@
+import glob
+import os
+from utils.upload_processing import decode_image
+
+UPLOAD_FOLDER = 'uploads'
+# Derivative widths (max dimension, aspect ratio preserved), smallest first
+DERIVATIVE_SIZES = (128, 400, 1024)
+THUMBNAIL_SIZE = 400
+DERIVATIVE_FORMATS = {'webp': ('WEBP', {'quality': 80, 'method': 4}), 'jpg': ('JPEG', {'quality': 85})}
+
+def original_filename(image_hash, ext):
+    return f"{image_hash}{ext.lower()}"
+
+def derivative_filename(image_hash, size, fmt):
+    return f"{image_hash}_{size}.{fmt}"
+
+def store_upload(upload):
+    """
+    Moves a spooled ProcessedUpload to its content-addressed place and returns
+    the filename. Identical uploads map to the same file, so a duplicate
+    submission is stored only once.
+    """
+    filename = original_filename(upload.content_hash, upload.ext)
+    final_path = os.path.join(UPLOAD_FOLDER, filename)
+    if os.path.exists(final_path):
+        upload.discard()
+    else:
+        os.replace(upload.path, final_path)
+    upload.path = final_path
+    return filename
+
+def generate_derivatives(image_hash, filename, image=None):
+    """
+    Writes every derivative size in WebP and JPEG from a single decoded image:
+    `image` if the caller already decoded the upload, the original on disk
+    otherwise. Each size is resized from the next larger one. Existing
+    derivatives (e.g. from a duplicate upload) are left alone.
+    """
+    wanted = [
+        (size, fmt) for size in DERIVATIVE_SIZES for fmt in DERIVATIVE_FORMATS
+        if not os.path.exists(os.path.join(UPLOAD_FOLDER, derivative_filename(image_hash, size, fmt)))
+    ]
+    if not wanted:
+        return
+
+    current = image if image is not None else decode_image(os.path.join(UPLOAD_FOLDER, filename))
+    for size in sorted(DERIVATIVE_SIZES, reverse=True):
+        current = current.copy()
+        current.thumbnail((size, size))
+        for fmt, (pil_format, options) in DERIVATIVE_FORMATS.items():
+            if (size, fmt) in wanted:
+                current.save(os.path.join(UPLOAD_FOLDER, derivative_filename(image_hash, size, fmt)), pil_format, **options)
+
+def select_derivative(image_hash, width=None, webp=True):
+    """Returns the filename of the smallest derivative at least `width` pixels wide."""
+    size = next((s for s in DERIVATIVE_SIZES if width is not None and s >= width), DERIVATIVE_SIZES[-1])
+    return derivative_filename(image_hash, size, 'webp' if webp else 'jpg')
+
+def release_image(image_hash, reference_count):
+    """Removes the original and all derivatives of an image once nothing references it."""
+    if reference_count > 0:
+        return
+    for path in glob.glob(os.path.join(UPLOAD_FOLDER, f"{image_hash}*")):
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Error deleting file {path}: {e}")
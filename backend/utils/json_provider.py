@@ -0,0 +1,34 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson. Types orjson can't encode natively (and
+    datetimes, to keep Flask's format) fall back to the default provider's
+    conversions.
+    """
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.options).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.options)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+def configure_json(app):
+    """Switches jsonify to orjson when FAST_JSON is set and orjson is installed."""
+    if not app.config.get('FAST_JSON'):
+        return
+    if orjson is None:
+        app.logger.warning("FAST_JSON is set but orjson is not installed; using the default JSON provider.")
+        return
+    app.json = OrjsonProvider(app)
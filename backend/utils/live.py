@@ -0,0 +1,230 @@
+import json
+import os
+import queue
+import threading
+import time
+from database import db
+from database.models import Report, ScrapedReport, ReportEvent, media_base_url
+from database.events import prune_report_events
+from utils.metrics import Counter, Gauge
+
+# How often the report_event log is read for new writes (by any process)
+POLL_INTERVAL = float(os.environ.get('LIVE_POLL_INTERVAL', 0.5))
+# Messages buffered per subscriber; a client that falls further behind gets a reset
+SUBSCRIBER_QUEUE_SIZE = int(os.environ.get('LIVE_QUEUE_SIZE', 256))
+# Every subscriber holds a worker thread for as long as it is connected
+MAX_SUBSCRIBERS = int(os.environ.get('LIVE_MAX_SUBSCRIBERS', 500))
+HEARTBEAT_SECONDS = 15
+RECONNECT_MS = 5000
+# More pending events than this (e.g. a full collector run) resets every subscriber instead
+MAX_BATCH_EVENTS = 1000
+PRUNE_INTERVAL = 300
+
+MODELS = {'user': Report, 'scraped': ScrapedReport}
+
+LIVE_SUBSCRIBERS = Gauge('neatstreet_live_subscribers', 'Connected live update subscribers.')
+LIVE_MESSAGES = Counter('neatstreet_live_messages_total', 'Live update messages queued for subscribers.', ['type'])
+LIVE_RESETS = Counter('neatstreet_live_resets_total', 'Subscribers reset after falling behind.')
+
+class TooManySubscribers(Exception):
+    pass
+
+class Subscription:
+    """One client's filters and its bounded queue of (type, data) messages."""
+
+    def __init__(self, sources, bbox=None, status=None):
+        self.sources = set(sources)
+        self.bbox = bbox
+        self.status = status
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def covers(self, source, lat, lon):
+        if source not in self.sources:
+            return False
+        if self.bbox is None:
+            return True
+        if lat is None or lon is None:
+            return False
+        sw_lat, sw_lng, ne_lat, ne_lng = self.bbox
+        return sw_lat <= lat <= ne_lat and sw_lng <= lon <= ne_lng
+
+    def shows(self, status):
+        """Whether a report with this open/closed/hidden status belongs in the client's list."""
+        return status in ('open', 'closed') and self.status in (None, status)
+
+    def offer(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            # The client can't keep up: drop its backlog and have it reload its list.
+            self.reset()
+
+    def reset(self):
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        LIVE_RESETS.inc()
+        self.queue.put_nowait(('reset', '{}'))
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class EventHub:
+    """
+    Fans report writes out to the connected subscribers.
+
+    One background thread per process tails the report_event log, which
+    triggers fill for writes from every process, and loads the written
+    reports once per batch. Each subscriber then gets the events inside its
+    bbox and status filter: an update that moves a report into or out of
+    the filter is sent as an insert or delete. Clients that fall behind by
+    more than their queue holds, or a burst of more than MAX_BATCH_EVENTS,
+    get a `reset` and should refetch their list.
+    """
+
+    def __init__(self, poll_interval=POLL_INTERVAL, max_subscribers=MAX_SUBSCRIBERS):
+        self.poll_interval = poll_interval
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_id = None
+        self._next_prune = 0.0
+
+    def subscribe(self, app, sources, bbox=None, status=None):
+        subscription = Subscription(sources, bbox, status)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers(f"Live updates are limited to {self.max_subscribers} clients")
+            self._subscribers.add(subscription)
+            LIVE_SUBSCRIBERS.set(len(self._subscribers))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(app,), name='live-events', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            LIVE_SUBSCRIBERS.set(len(self._subscribers))
+
+    def _run(self, app):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                with app.app_context():
+                    self.poll()
+            except Exception as e:
+                print(f"Live update poll failed: {e}")
+
+    def poll(self):
+        """Reads the events logged since the last poll and queues them for the subscribers."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            # Nobody to send the backlog to; the next subscriber starts from the latest event.
+            self._last_id = None
+            return
+        if self._last_id is None:
+            self._last_id = db.session.scalar(db.select(db.func.max(ReportEvent.id))) or 0
+            return
+
+        events = db.session.execute(
+            db.select(ReportEvent).where(ReportEvent.id > self._last_id)
+            .order_by(ReportEvent.id).limit(MAX_BATCH_EVENTS + 1)
+        ).scalars().all()
+        if len(events) > MAX_BATCH_EVENTS:
+            self._last_id = db.session.scalar(db.select(db.func.max(ReportEvent.id)))
+            for subscription in subscribers:
+                subscription.reset()
+        elif events:
+            self._last_id = events[-1].id
+            self._publish(_coalesce(events), subscribers)
+
+        if time.monotonic() >= self._next_prune:
+            self._next_prune = time.monotonic() + PRUNE_INTERVAL
+            prune_report_events()
+            db.session.commit()
+
+    def _publish(self, changes, subscribers):
+        # Each report is loaded and encoded once, whatever the number of subscribers.
+        base_url = media_base_url()
+        payloads = {}
+        for source, model in MODELS.items():
+            ids = [report_id for (s, report_id), change in changes.items() if s == source and change['action'] != 'delete']
+            if ids:
+                rows = db.session.execute(db.select(*model.serialized_columns()).where(model.id.in_(ids)))
+                payloads.update({(source, row.id): json.dumps(model.serialize(row, base_url)) for row in rows})
+
+        for (source, report_id), change in changes.items():
+            removal = json.dumps({'source': source, 'id': report_id})
+            for subscription in subscribers:
+                if not subscription.covers(source, change['latitude'], change['longitude']):
+                    continue
+                # previous_status is the status before the batch, None for new reports
+                was_shown = subscription.shows(change['previous_status'])
+                if change['action'] == 'delete':
+                    message = ('delete', removal) if was_shown else None
+                elif subscription.shows(change['status']):
+                    message = ('update' if was_shown else 'insert', payloads.get((source, report_id)))
+                else:
+                    message = ('delete', removal) if was_shown else None
+                # A report deleted since the event was logged has no payload; its delete event follows.
+                if message is None or message[1] is None:
+                    continue
+                LIVE_MESSAGES.inc(message[0])
+                subscription.offer(message)
+
+def _coalesce(events):
+    """
+    Merges the events of a batch per report, so a report written several
+    times is sent once. A merged change keeps the status the report had
+    before the batch as its previous_status, so e.g. an open report that is
+    hidden and then deleted is still removed from the maps showing it.
+    """
+    changes = {}
+    for event in events:
+        key = (event.source, event.report_id)
+        change = {
+            'action': event.action,
+            'status': event.status,
+            # A delete logs the deleted row's status as its status
+            'previous_status': event.status if event.action == 'delete' else event.previous_status,
+            'latitude': event.latitude,
+            'longitude': event.longitude,
+        }
+        earlier = changes.pop(key, None)
+        if earlier is not None:
+            if earlier['action'] == 'insert':
+                if event.action == 'delete':
+                    continue
+                change['action'] = 'insert'
+            change['previous_status'] = earlier['previous_status']
+        changes[key] = change
+    return changes
+
+def event_stream(hub, subscription):
+    """
+    The Server-Sent Events body for one subscription: `insert`/`update`
+    events carry the serialized report, `delete` events its source and id,
+    and `reset` asks the client to refetch. Comments keep idle connections
+    open through proxies. The subscription ends when the client disconnects.
+    """
+    try:
+        yield f"retry: {RECONNECT_MS}\n\n"
+        while True:
+            message = subscription.get(HEARTBEAT_SECONDS)
+            if message is None:
+                yield ": keepalive\n\n"
+                continue
+            event_type, data = message
+            yield f"event: {event_type}\ndata: {data}\n\n"
+    finally:
+        hub.unsubscribe(subscription)
+
+live_events = EventHub()
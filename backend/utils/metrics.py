@@ -0,0 +1,188 @@
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import g, request, has_request_context, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Requests slower than this are logged with their query breakdown (0 disables the log)
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 0))
+# Prometheus textfile-collector path that CLI commands (e.g. the collector) write their metrics to
+METRICS_TEXTFILE = os.environ.get('METRICS_TEXTFILE')
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+_registry = []
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}   # labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, counts in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {counts[-1]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+REQUEST_SECONDS = Histogram('neatstreet_request_duration_seconds', 'HTTP request latency.', ['endpoint', 'method', 'status'])
+REQUEST_QUERIES = Histogram('neatstreet_request_queries', 'SQL queries per HTTP request.', ['endpoint'], QUERY_COUNT_BUCKETS)
+REQUEST_QUERY_SECONDS = Histogram('neatstreet_request_query_duration_seconds', 'Time spent in SQL per HTTP request.', ['endpoint'])
+QUERIES = Counter('neatstreet_db_queries_total', 'SQL statements executed.')
+QUERY_SECONDS = Counter('neatstreet_db_query_seconds_total', 'Time spent executing SQL statements.')
+STAGE_SECONDS = Histogram('neatstreet_stage_duration_seconds', 'Time spent in a processing stage.', ['stage'])
+STAGE_ERRORS = Counter('neatstreet_stage_errors_total', 'Processing stages that raised.', ['stage'])
+
+@contextmanager
+def stage(name):
+    """
+    Times a processing stage (decode, thumbnail, classify, geocode, commit,
+    collector fetch/parse/ingest, ...). Inside a request the time is also
+    added to that request's slow-log breakdown.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, name)
+        if has_request_context() and 'metrics_stages' in g:
+            g.metrics_stages[name] = g.metrics_stages.get(name, 0.0) + elapsed
+
+def stage_totals():
+    """Total seconds spent in each stage so far in this process."""
+    with STAGE_SECONDS._lock:
+        return {labels[0]: counts[-1] for labels, counts in STAGE_SECONDS._values.items()}
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+def write_textfile(path=METRICS_TEXTFILE):
+    """Writes the metrics for node_exporter's textfile collector; used by CLI commands, which have no /metrics."""
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+_WHITESPACE = re.compile(r'\s+')
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['metrics_query_start'].pop()
+    QUERIES.inc()
+    QUERY_SECONDS.inc(amount=elapsed)
+    if has_request_context() and 'metrics_queries' in g:
+        g.metrics_query_count += 1
+        g.metrics_query_seconds += elapsed
+        if SLOW_REQUEST_MS:
+            key = _WHITESPACE.sub(' ', statement)[:160]
+            count, total = g.metrics_queries.get(key, (0, 0.0))
+            g.metrics_queries[key] = (count + 1, total + elapsed)
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_query_count = 0
+    g.metrics_query_seconds = 0.0
+    g.metrics_queries = {}
+    g.metrics_stages = {}
+
+def _after_request(response):
+    if 'metrics_start' not in g:
+        return response
+    elapsed = time.perf_counter() - g.metrics_start
+    # The endpoint name, not the path, so ids don't each get their own series
+    endpoint = request.endpoint or 'unmatched'
+    REQUEST_SECONDS.observe(elapsed, endpoint, request.method, response.status_code)
+    REQUEST_QUERIES.observe(g.metrics_query_count, endpoint)
+    REQUEST_QUERY_SECONDS.observe(g.metrics_query_seconds, endpoint)
+
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        print(
+            f"Slow request: {request.method} {request.full_path.rstrip('?')} -> {response.status_code} "
+            f"in {elapsed * 1000:.0f}ms, {g.metrics_query_count} queries in {g.metrics_query_seconds * 1000:.0f}ms"
+        )
+        for name, seconds in sorted(g.metrics_stages.items(), key=lambda s: -s[1]):
+            print(f"  - stage {name}: {seconds * 1000:.1f}ms")
+        for statement, (count, seconds) in sorted(g.metrics_queries.items(), key=lambda q: -q[1][1])[:10]:
+            print(f"  - {count}x {seconds * 1000:.1f}ms {statement}")
+    return response
+
+def metrics_view():
+    return Response(render(), mimetype='text/plain; version=0.0.4')
+
+def init_metrics(app):
+    """Times every request and serves all metrics on /metrics."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
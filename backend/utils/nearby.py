@@ -0,0 +1,91 @@
+import heapq
+import math
+from database import db
+from database.models import media_base_url
+from database.spatial import bbox_filter
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = 111320.0
+# k-nearest searches start at this radius and double until k reports are found
+INITIAL_RADIUS_M = 250.0
+# City scale: radius searches and the k-nearest expansion stop here
+MAX_RADIUS_M = 5000.0
+# Each source returns at most this many candidates per lookup
+MAX_CANDIDATES = 1000
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+def _bbox_around(lat, lon, radius_m):
+    """The bounding box enclosing a circle of `radius_m` around a point."""
+    dlat = radius_m / METERS_PER_DEGREE_LAT
+    dlon = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+def _within(sources, lat, lon, radius_m, limit):
+    """(distance, type, row) for the reports within `radius_m`, at most `limit` from each source."""
+    bbox = _bbox_around(lat, lon, radius_m)
+    # Squared equirectangular distance in degrees: ranks like the great-circle
+    # distance at city scale, and is cheap enough for SQLite to sort on.
+    lon_scale = math.cos(math.radians(lat))
+    approx_distance = lambda model: (
+        (model.latitude - lat) * (model.latitude - lat)
+        + (model.longitude - lon) * (model.longitude - lon) * (lon_scale * lon_scale)
+    )
+    # Twice the needed candidates leave room for the approximation; the exact
+    # haversine distance picks the final ones.
+    candidates = min(2 * limit, MAX_CANDIDATES)
+    found = []
+    for report_type, model, filters in sources:
+        # The R*Tree narrows the candidates to the enclosing box, and only the nearest of those are loaded.
+        rows = db.session.execute(
+            db.select(*model.serialized_columns())
+            .where(*bbox_filter(model, *bbox), *filters)
+            .order_by(approx_distance(model))
+            .limit(candidates)
+        ).all()
+        for row in rows:
+            distance = haversine_m(lat, lon, row.latitude, row.longitude)
+            if distance <= radius_m:
+                found.append((distance, report_type, row))
+    return found
+
+def nearest_reports(sources, lat, lon, radius_m=None, k=None):
+    """
+    Returns reports near a point, closest first, with their distance in meters.
+
+    `sources` is a list of (type, model, filters) tuples, like cluster_reports.
+    With `radius_m`, the reports within the radius are returned (at most `k`,
+    or MAX_CANDIDATES per source). With only `k`, the search radius starts at
+    INITIAL_RADIUS_M and doubles until k reports are inside the circle, up to
+    MAX_RADIUS_M; reports inside the circle are then the k nearest. Only the
+    nearest candidates of each source are loaded, never every row in range.
+    """
+    limit = k if k is not None else MAX_CANDIDATES
+    if radius_m is not None:
+        found = _within(sources, lat, lon, radius_m, limit)
+    else:
+        radius = INITIAL_RADIUS_M
+        while True:
+            found = _within(sources, lat, lon, radius, limit)
+            if len(found) >= k or radius >= MAX_RADIUS_M:
+                break
+            radius = min(radius * 2, MAX_RADIUS_M)
+
+    key = lambda item: item[0]
+    found = heapq.nsmallest(k, found, key=key) if k is not None else sorted(found, key=key)
+
+    base_url = media_base_url()
+    results = []
+    for distance, report_type, row in found:
+        model = next(model for t, model, _ in sources if t == report_type)
+        report_dict = model.serialize(row, base_url)
+        report_dict['type'] = report_type
+        report_dict['distance_m'] = round(distance, 1)
+        results.append(report_dict)
+    return results
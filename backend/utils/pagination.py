@@ -0,0 +1,53 @@
+import base64
+import json
+from datetime import datetime
+from database import db
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(sort_value, row_id):
+    # sort_value is None for rows with a NULL sort column (e.g. old reports without a timestamp)
+    payload = json.dumps([sort_value and sort_value.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decodes a cursor from `encode_cursor`. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (None if sort_value is None else datetime.fromisoformat(sort_value)), int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def page_size(requested):
+    if requested is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(requested, MAX_PAGE_SIZE))
+
+def paginate(query, sort_column, id_column, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Returns (rows, next_cursor) for one page of `query`, newest first.
+
+    Pages are keyed on (sort_column, id_column) rather than an offset, so with
+    a matching composite index every page is an index range scan, however deep
+    into the results it is. `next_cursor` is None on the last page. Rows with
+    a NULL sort_column come last, as SQLite sorts them.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        if sort_value is None:
+            query = query.filter(sort_column.is_(None), id_column < row_id)
+        else:
+            query = query.filter(db.or_(
+                db.tuple_(sort_column, id_column) < db.tuple_(sort_value, row_id),
+                sort_column.is_(None),
+            ))
+
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
@@ -0,0 +1,99 @@
+import json
+import os
+import time
+import click
+from flask import current_app
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from utils.upload_processing import ProcessedUpload, UPLOAD_FOLDER
+
+STAGING_FOLDER = os.path.join(UPLOAD_FOLDER, 'staging')
+# How long a /classify upload can be turned into a report without re-uploading
+STAGING_TTL = int(os.environ.get('STAGING_TTL', 30 * 60))
+PURGE_INTERVAL = 60
+
+_next_purge = 0.0
+
+class InvalidUploadToken(Exception):
+    pass
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='staged-upload')
+
+def _paths(content_hash, ext):
+    image_path = os.path.join(STAGING_FOLDER, f"{content_hash}{ext}")
+    return image_path, os.path.join(STAGING_FOLDER, f"{content_hash}.json")
+
+def cached_prediction(content_hash):
+    """Returns (True, issue_type) if this content was already classified and is still staged."""
+    try:
+        with open(os.path.join(STAGING_FOLDER, f"{content_hash}.json")) as f:
+            return True, json.load(f)['issue_type']
+    except (OSError, ValueError, KeyError):
+        return False, None
+
+def stage_upload(upload, issue_type):
+    """
+    Keeps a /classify upload and its prediction, keyed by content hash, and
+    returns a signed token that POST /report accepts instead of the image.
+    """
+    os.makedirs(STAGING_FOLDER, exist_ok=True)
+    image_path, prediction_path = _paths(upload.content_hash, upload.ext)
+    if os.path.exists(image_path):
+        upload.discard()
+        os.utime(image_path)   # restart the expiry clock
+    else:
+        os.replace(upload.path, image_path)
+    upload.path = image_path
+    with open(prediction_path, 'w') as f:
+        json.dump({'issue_type': issue_type}, f)
+
+    _maybe_purge()
+    return _serializer().dumps({'hash': upload.content_hash, 'ext': upload.ext})
+
+def load_staged_upload(token):
+    """
+    Returns (ProcessedUpload, issue_type) for a token from `stage_upload`.
+    Raises InvalidUploadToken if it is forged, expired or already purged.
+    """
+    try:
+        data = _serializer().loads(token, max_age=STAGING_TTL)
+    except SignatureExpired:
+        raise InvalidUploadToken('Upload token has expired; upload the image again')
+    except BadSignature:
+        raise InvalidUploadToken('Invalid upload token')
+
+    image_path, _ = _paths(data['hash'], data['ext'])
+    if not os.path.exists(image_path):
+        raise InvalidUploadToken('Upload token has expired; upload the image again')
+    _, issue_type = cached_prediction(data['hash'])
+    return ProcessedUpload.from_file(image_path, data['hash'], data['ext']), issue_type
+
+def purge_expired(now=None):
+    """Deletes staged uploads (and predictions) older than STAGING_TTL. Returns the number of files removed."""
+    now = now or time.time()
+    removed = 0
+    if not os.path.isdir(STAGING_FOLDER):
+        return removed
+    for entry in os.scandir(STAGING_FOLDER):
+        try:
+            # A little past the token lifetime, so a token can't outlive its file mid-request
+            if entry.stat().st_mtime < now - STAGING_TTL - PURGE_INTERVAL:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+def _maybe_purge():
+    global _next_purge
+    if time.monotonic() >= _next_purge:
+        _next_purge = time.monotonic() + PURGE_INTERVAL
+        purge_expired()
+
+@click.command('purge-staged-uploads')
+def purge_staged_uploads_command():
+    """Deletes expired uploads staged by /classify."""
+    print(f"Removed {purge_expired()} expired staged files.")
+
+def register_staging(app):
+    app.cli.add_command(purge_staged_uploads_command)
@@ -0,0 +1,84 @@
+import hashlib
+import os
+import threading
+import uuid
+from PIL import Image as PILImage, ImageOps
+from utils.metrics import stage
+
+UPLOAD_FOLDER = 'uploads'
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', 20 * 1024 * 1024))
+# Images are decoded at no less than this size: enough for the largest
+# derivative and for classification, far less than a full phone photo.
+DECODE_SIZE = 1024
+
+class UploadTooLarge(Exception):
+    pass
+
+def decode_image(path):
+    """
+    Decodes an image file to an upright RGB image at no less than DECODE_SIZE
+    on its longer side (when the original is that large).
+    """
+    with stage('decode'), PILImage.open(path) as img:
+        img.draft('RGB', (DECODE_SIZE, DECODE_SIZE))   # only has an effect on JPEGs
+        return ImageOps.exif_transpose(img).convert('RGB')
+
+class ProcessedUpload:
+    """
+    An image upload read from the request exactly once.
+
+    The request stream is copied to a temporary file in uploads/ while it is
+    hashed and checked against `max_bytes`. The image is decoded at most once,
+    lazily, and the same decoded image is shared by thumbnailing,
+    classification and storage. JPEGs use draft mode, so the decoder
+    downscales by up to 8x while decoding instead of materializing every
+    pixel. EXIF orientation is applied.
+    """
+
+    def __init__(self, file_storage, max_bytes=MAX_UPLOAD_BYTES, chunk_size=64 * 1024):
+        self.ext = os.path.splitext(file_storage.filename or '')[1].lower()
+        self.path = os.path.join(UPLOAD_FOLDER, f".tmp_{uuid.uuid4().hex}")
+        self.size = 0
+        self._image = None
+        self._decode_lock = threading.Lock()
+
+        digest = hashlib.sha256()
+        file_storage.stream.seek(0)
+        try:
+            with open(self.path, 'wb') as out:
+                while chunk := file_storage.stream.read(chunk_size):
+                    self.size += len(chunk)
+                    if self.size > max_bytes:
+                        raise UploadTooLarge(f"Image exceeds the {max_bytes}-byte upload limit")
+                    digest.update(chunk)
+                    out.write(chunk)
+        except Exception:
+            self.discard()
+            raise
+        self.content_hash = digest.hexdigest()
+
+    @classmethod
+    def from_file(cls, path, content_hash, ext):
+        """An upload that is already on disk under uploads/ (e.g. staged by /classify)."""
+        upload = cls.__new__(cls)
+        upload.path, upload.content_hash, upload.ext = path, content_hash, ext
+        upload.size = os.path.getsize(path)
+        upload._image = None
+        upload._decode_lock = threading.Lock()
+        return upload
+
+    @property
+    def image(self):
+        """The decoded image (see decode_image), decoded on first access."""
+        with self._decode_lock:
+            if self._image is None:
+                self._image = decode_image(self.path)
+            return self._image
+
+    def discard(self):
+        """Removes the temporary file if the upload was never stored."""
+        if os.path.basename(self.path).startswith('.tmp_'):
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
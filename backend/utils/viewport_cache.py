@@ -0,0 +1,192 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from database import db
+from database.models import CacheInvalidation
+
+# Bounding boxes are snapped outwards to this grid (about 1.1km), so map pans
+# that differ only slightly share a cache entry.
+TILE_SIZE = 0.01
+TTL_SECONDS = float(os.environ.get('VIEWPORT_CACHE_TTL', 60))
+MAX_BYTES = int(os.environ.get('VIEWPORT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+# How often the invalidation log is read for writes made by other processes
+POLL_INTERVAL = float(os.environ.get('VIEWPORT_CACHE_POLL_INTERVAL', 0.5))
+# Regions holding more reports than this are queried directly, not cached
+MAX_CACHED_ROWS = int(os.environ.get('VIEWPORT_CACHE_MAX_ROWS', 5000))
+# Writes touching more reports than this invalidate the whole namespace
+MAX_LOGGED_POINTS = 1000
+LOG_RETENTION = timedelta(hours=1)
+
+def _tile(lat, lon):
+    return math.floor((lat + 90.0) / TILE_SIZE), math.floor((lon + 180.0) / TILE_SIZE)
+
+def snap_bbox(sw_lat, sw_lng, ne_lat, ne_lng):
+    """Expands a bounding box outwards to tile boundaries."""
+    south, west = _tile(sw_lat, sw_lng)
+    north, east = _tile(ne_lat, ne_lng)
+    return (
+        round(south * TILE_SIZE - 90.0, 6),
+        round(west * TILE_SIZE - 180.0, 6),
+        round((north + 1) * TILE_SIZE - 90.0, 6),
+        round((east + 1) * TILE_SIZE - 180.0, 6),
+    )
+
+class CachedRow:
+    """One report of a cached region: its sort key, position and serialized JSON."""
+    __slots__ = ('sort_value', 'id', 'latitude', 'longitude', 'body')
+
+    def __init__(self, sort_value, id, latitude, longitude, body):
+        self.sort_value = sort_value
+        self.id = id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.body = body
+
+class _Entry:
+    __slots__ = ('rows', 'namespace', 'tiles', 'expires', 'size')
+
+    def __init__(self, rows, namespace, tiles, expires):
+        self.rows = rows
+        self.namespace = namespace
+        self.tiles = tiles
+        self.expires = expires
+        # Bodies plus a rough per-row and per-entry overhead
+        self.size = sum(len(row.body) + 128 for row in rows) + 256
+
+class ViewportCache:
+    """
+    Caches the reports of a snapped map region, keyed on the snapped bbox and
+    filters. Each cached region serves every viewport inside it: callers
+    filter its rows to the exact bbox and paginate them.
+
+    Entries expire after TTL_SECONDS and are evicted least-recently-used
+    first once their bodies exceed MAX_BYTES. A write drops only the entries
+    of its namespace whose bbox contains the written report's tile (or that
+    have no bbox). Writes in this process invalidate right away. Writes from
+    other processes, like the scrape collector, are picked up from the
+    CacheInvalidation log at most POLL_INTERVAL seconds later.
+    """
+
+    def __init__(self, ttl=TTL_SECONDS, max_bytes=MAX_BYTES, poll_interval=POLL_INTERVAL):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.poll_interval = poll_interval
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._last_log_id = None
+        self._next_poll = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Returns the cached CachedRows for a key, newest first, or None."""
+        self._poll_log()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.rows
+
+    def put(self, key, namespace, bbox, rows):
+        """Caches the CachedRows of the region `bbox` for `key`."""
+        tiles = None
+        if bbox is not None:
+            (south, west), (north, east) = _tile(bbox[0], bbox[1]), _tile(bbox[2], bbox[3])
+            tiles = (south, north, west, east)
+        entry = _Entry(rows, namespace, tiles, time.monotonic() + self.ttl)
+        if entry.size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, namespace, points=None):
+        """Drops entries of `namespace` covering any of `points`, or all of them if points is None."""
+        point_tiles = None if points is None else {_tile(lat, lon) for lat, lon in points if lat is not None and lon is not None}
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.namespace == namespace and self._covers(e, point_tiles)]:
+                self._remove(key)
+                self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    @staticmethod
+    def _covers(entry, point_tiles):
+        if entry.tiles is None or point_tiles is None:
+            return True
+        south, north, west, east = entry.tiles
+        return any(south <= row <= north and west <= col <= east for row, col in point_tiles)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _poll_log(self):
+        now = time.monotonic()
+        if now < self._next_poll:
+            return
+        self._next_poll = now + self.poll_interval
+
+        if self._last_log_id is None:
+            # Nothing is cached yet, so only writes from here on matter.
+            self._last_log_id = db.session.execute(db.select(db.func.max(CacheInvalidation.id))).scalar() or 0
+            return
+        rows = db.session.execute(
+            db.select(CacheInvalidation.id, CacheInvalidation.namespace, CacheInvalidation.latitude, CacheInvalidation.longitude)
+            .where(CacheInvalidation.id > self._last_log_id)
+            .order_by(CacheInvalidation.id)
+        ).all()
+        for row in rows:
+            self.invalidate(row.namespace, None if row.latitude is None else [(row.latitude, row.longitude)])
+            self._last_log_id = row.id
+
+viewport_cache = ViewportCache()
+
+def invalidate_reports(namespace, points=None):
+    """
+    Records that reports of `namespace` ('user' or 'scraped') changed at
+    `points` ([(lat, lon), ...]; None means anywhere). The log rows are added
+    to the current session, so they commit together with the write.
+    """
+    if points is not None and not points:
+        return
+    if points is not None and len(points) > MAX_LOGGED_POINTS:
+        points = None
+    if points is None:
+        db.session.add(CacheInvalidation(namespace=namespace))
+    else:
+        db.session.execute(db.insert(CacheInvalidation), [
+            {'namespace': namespace, 'latitude': lat, 'longitude': lon} for lat, lon in points
+        ])
+    viewport_cache.invalidate(namespace, points)
+
+def prune_invalidation_log():
+    """Deletes log rows old enough that every process has read them."""
+    db.session.execute(db.delete(CacheInvalidation).where(CacheInvalidation.created_at < datetime.now() - LOG_RETENTION))